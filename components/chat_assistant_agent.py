@@ -1,98 +1,231 @@
 import os
-from utils.google_adk_manager import GoogleADKManager
+import sys
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Mapping
+from utils.google_adk_manager import get_adk_manager, FAILED_RESPONSE_PREFIX
+from utils.llm_cache import LLMCache, SemanticCache
+from utils.embeddings import get_query_embedder
+from utils.transcript_index import get_transcript_index
 
-class ChatAssistantAgent:
-    def __init__(self):
-        """Initialize the ChatAssistantAgent class."""
-        self.adk_manager = GoogleADKManager()
+# System prompt for chat assistant
+_CHAT_SYSTEM_PROMPT = """
+You are an expert educational assistant specializing in helping users understand video content.
+Your task is to answer questions about the video accurately and helpfully.
+
+When responding:
+1. Be concise and clear in your explanations
+2. Reference specific parts of the video content when relevant
+3. If the answer isn't in the transcript, acknowledge that and provide general information if possible
+4. Maintain a helpful, friendly, and educational tone
+"""
+
+# Per-video context block sent as the first user turn, ahead of the chat history
+_CONTEXT_TEMPLATE = """
+Video Title: {title}
+Video Channel: {channel}
+
+Video Summary:
+{summary_text}
+
+Key Points:
+{key_points}
+"""
+
+# Reply when no video has been processed yet
+_NO_TRANSCRIPT_MSG = sys.intern("To answer your question about the video, I'll need to process a video first. Could you please go to the Video Processing section and input a YouTube URL?")
+
+# Placeholder used when no transcript passage could be retrieved
+_NO_PASSAGES_MSG = sys.intern('Transcript not available')
+
+# Number of transcript passages retrieved for each question
+_RELEVANT_PASSAGES = 3
+
+# Number of previous chat messages included with each question
+CHAT_HISTORY_WINDOW = 5
+
+def new_chat_window(chat_messages=()):
+    """
+    Create the rolling window of recent chat messages passed to generate_response.
+    
+    Args:
+        chat_messages (iterable): Existing chat messages ({"role", "content"} dicts)
         
-    def generate_response(self, user_query, context):
+    Returns:
+        deque: (role, content) tuples for the last CHAT_HISTORY_WINDOW messages
+    """
+    return deque(
+        ((msg.get('role', 'user'), msg.get('content', '')) for msg in chat_messages),
+        maxlen=CHAT_HISTORY_WINDOW
+    )
+
+@lru_cache(maxsize=32)
+def _build_context_message(title, channel, summary_text, key_points):
+    """Render the context block for a video; identical inputs return the identical string."""
+    return _CONTEXT_TEMPLATE.format(
+        title=title,
+        channel=channel,
+        summary_text=summary_text,
+        key_points=', '.join(key_points)
+    )
+
+@dataclass(slots=True, frozen=True)
+class ChatContext:
+    """
+    Per-video chat context, validated and rendered once and reused for every question.
+    
+    Attributes:
+        transcript (str): Video transcript
+        video_info (Mapping): Information about the video
+        summary_text (str): Summary of the video
+        key_points (tuple): Key points from the summary
+        context_message (str): Rendered context block sent with each question
+    """
+    transcript: str
+    video_info: Mapping
+    summary_text: str
+    key_points: tuple[str, ...]
+    context_message: str
+    
+    @classmethod
+    def build(cls, raw):
         """
-        Generate a response to the user's query about video content.
+        Build a chat context from the raw context dictionary.
         
         Args:
-            user_query (str): User's question
-            context (dict): Context information including transcript and video info
+            raw (dict): Context information including transcript, video info and summary
             
         Returns:
-            str: Generated response
+            ChatContext: Normalized context
         """
-        transcript = context.get('transcript', '')
-        video_info = context.get('video_info', {})
-        summary = context.get('summary')
+        transcript = raw.get('transcript') or ''
+        video_info = raw.get('video_info') or {}
         # Ensure summary is a dictionary, not None
-        if summary is None:
-            summary = {}
-        chat_history = context.get('chat_history', [])
-        
-        # Check if there's a transcript
-        if not transcript:
-            return "To answer your question about the video, I'll need to process a video first. Could you please go to the Video Processing section and input a YouTube URL?"
-        
-        # Format chat history for the prompt
-        formatted_messages = []
-        for msg in chat_history[-5:]:  # Include only the last 5 messages for context
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            formatted_messages.append({"role": role, "content": content})
-        
-        # System prompt for chat assistant
-        system_prompt = """
-        You are an expert educational assistant specializing in helping users understand video content.
-        Your task is to answer questions about the video accurately and helpfully.
+        summary = raw.get('summary') or {}
         
-        When responding:
-        1. Be concise and clear in your explanations
-        2. Reference specific parts of the video content when relevant
-        3. If the answer isn't in the transcript, acknowledge that and provide general information if possible
-        4. Maintain a helpful, friendly, and educational tone
-        """
-        
-        # Prepare context for the message
         # Handle summary content safely
         summary_text = "Not available"
-        if summary and 'summary_text' in summary:
+        if 'summary_text' in summary:
             summary_text = summary.get('summary_text')
         
         key_points = ["Not available"]
-        if summary and 'key_points' in summary:
+        if 'key_points' in summary:
             key_points = summary.get('key_points')
             if not key_points or not isinstance(key_points, list):
                 key_points = ["No key points available"]
+        key_points = tuple(key_points)
         
-        context_message = f"""
-        Video Title: {video_info.get('title', 'Unknown')}
-        Video Channel: {video_info.get('channel', 'Unknown')}
+        # Render the context through a memoized builder so the same video always produces
+        # the same bytes, keeping the [system][context] prompt prefix cacheable by the provider
+        context_message = _build_context_message(
+            video_info.get('title', 'Unknown'),
+            video_info.get('channel', 'Unknown'),
+            summary_text,
+            key_points
+        )
         
-        Video Summary:
-        {summary_text}
+        return cls(transcript, video_info, summary_text, key_points, context_message)
+
+# Responses shared across agent instances (Streamlit creates a new agent on every rerun),
+# kept on disk for a day
+CHAT_CACHE_TTL = 24 * 60 * 60
+_RESPONSE_CACHE = LLMCache("chat", maxsize=512, ttl=CHAT_CACHE_TTL, persist=True)
+
+# Answers to near-duplicate questions ("Summarize the video" / "Give me a summary")
+_SEMANTIC_CACHE = SemanticCache(get_query_embedder(), threshold=0.92)
+
+class ChatAssistantAgent:
+    def __init__(self):
+        """Initialize the ChatAssistantAgent class."""
+        self.adk_manager = get_adk_manager()
         
-        Key Points:
-        {', '.join(key_points)}
+    def generate_response(self, user_query, context, chat_history=None, cache_bypass=False):
+        """
+        Generate a response to the user's query about video content.
         
-        Relevant part of transcript:
-        {transcript[:2000] if len(transcript) > 0 else 'Transcript not available'}
+        Args:
+            user_query (str): User's question
+            context (ChatContext or dict): Context for the current video; a raw dict
+                (transcript, video_info, summary, chat_history) is converted on each call
+            chat_history (deque or list, optional): Recent (role, content) tuples from
+                new_chat_window, or previous chat message dicts (defaults to the dict's chat_history)
+            cache_bypass (bool): Skip the response cache and always call the model
+            
+        Returns:
+            str: Generated response
         """
+        # Check if there's a transcript before doing any other work
+        if isinstance(context, ChatContext):
+            if not context.transcript:
+                return _NO_TRANSCRIPT_MSG
+        else:
+            if not context.get('transcript'):
+                return _NO_TRANSCRIPT_MSG
+            if chat_history is None:
+                chat_history = context.get('chat_history', [])
+            context = ChatContext.build(context)
+        
+        if not isinstance(chat_history, deque):
+            chat_history = new_chat_window((chat_history or [])[-CHAT_HISTORY_WINDOW:])
+        transcript = context.transcript
+        context_message = context.context_message
+        
+        # Retrieve the passages most relevant to the question instead of always sending
+        # the opening of the transcript. The context block goes ahead of the history as the
+        # first user turn, so [system][context] stays a stable prefix on every turn
+        relevant_passages = get_transcript_index(transcript).top_passages(user_query, n=_RELEVANT_PASSAGES)
+        relevant_transcript = "\n".join(relevant_passages) or _NO_PASSAGES_MSG
+        prompt = f"Relevant part of transcript:\n{relevant_transcript}\n\nUser Question: {user_query}"
         
         try:
-            # Prepare messages for OpenAI API
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Add chat history if available
-            if formatted_messages:
-                messages.extend(formatted_messages)
+            temperature = 0.7
+            max_tokens = 300
             
-            # Add context and user query
-            messages.append({"role": "user", "content": f"{context_message}\n\nUser Question: {user_query}"})
+            # Identical questions about the same content can reuse an earlier answer
+            history = tuple(chat_history)
+            cache_key = LLMCache.make_key(
+                self.adk_manager.get_model(), _CHAT_SYSTEM_PROMPT, context_message, history, prompt,
+                temperature, max_tokens
+            )
+            # Rephrased questions are only matched for the opening question about a video:
+            # later answers depend on the conversation, which would almost never repeat, so
+            # those questions aren't embedded at all
+            semantic_scope = None
+            if not history:
+                semantic_scope = LLMCache.make_key(
+                    self.adk_manager.get_model(), _CHAT_SYSTEM_PROMPT, context_message, transcript
+                )
+            query_vector = None
+            if not cache_bypass:
+                cached_response = _RESPONSE_CACHE.get(cache_key)
+                if cached_response is not None:
+                    return cached_response
+                
+                if semantic_scope is not None:
+                    query_vector = _SEMANTIC_CACHE.embed(user_query)
+                    cached_response = _SEMANTIC_CACHE.get(semantic_scope, query_vector)
+                    if cached_response is not None:
+                        return cached_response
             
             # Use Google ADK API to generate response
             response_text = self.adk_manager.generate_text(
-                prompt=f"{context_message}\n\nUser Question: {user_query}",
-                system_prompt=system_prompt,
-                temperature=0.7,
-                max_tokens=300
+                prompt=prompt,
+                system_prompt=_CHAT_SYSTEM_PROMPT,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                history=history,
+                context=context_message
             )
             
+            # Don't cache failures so the next attempt retries the model
+            if response_text and not response_text.startswith(FAILED_RESPONSE_PREFIX):
+                _RESPONSE_CACHE.set(cache_key, response_text)
+                if semantic_scope is not None:
+                    if query_vector is None:
+                        query_vector = _SEMANTIC_CACHE.embed(user_query)
+                    _SEMANTIC_CACHE.set(semantic_scope, query_vector, response_text)
+            
             # Return the generated response
             return response_text
             
@@ -1,13 +1,141 @@
 import os
-import json
-from utils.google_adk_manager import GoogleADKManager
+from functools import lru_cache
+from itertools import cycle, islice
+from types import MappingProxyType
+from utils.google_adk_manager import get_adk_manager
+from utils.llm_cache import LLMCache
+from utils.json_utils import JSONDecodeError, extract_json, iter_json_elements, loads
+from utils.transcript_index import get_transcript_index
+from components.schemas import Flashcard
+
+# Transcript windows generated concurrently, and the (approximate) token budget
+# for the transcript passages sampled across all of them
+MAX_SHARDS = 4
+TRANSCRIPT_TOKEN_BUDGET = 1800
+
+# Generated flashcard sets, kept on disk for 30 days so revisiting a video is free
+FLASHCARD_CACHE_TTL = 30 * 24 * 60 * 60
+_FLASHCARD_CACHE = LLMCache("flashcards", maxsize=64, ttl=FLASHCARD_CACHE_TTL, persist=True)
+
+# System prompt template for flashcard generation; only the focus area varies
+_FLASHCARD_SYSTEM_PROMPT_TEMPLATE = """
+You are an expert educational content creator specializing in effective flashcards. 
+Your task is to create clear, concise flashcards based on video content.
+
+For each flashcard:
+1. Create a front side with a question or prompt
+2. Create a back side with the answer or explanation
+
+Focus on {focus} from the content.
+Follow principles of spaced repetition by creating cards that test recall effectively.
+"""
+
+# The response is a bare JSON array of flashcards, so it still streams card by card
+_FLASHCARD_LIST_SCHEMA = list[Flashcard]
+
+@lru_cache(maxsize=16)
+def _flashcard_system_prompt(focus_area):
+    """Build the flashcard system prompt for a focus area (one of a handful of values)."""
+    return _FLASHCARD_SYSTEM_PROMPT_TEMPLATE.format(focus=focus_area.lower())
+
+def _iter_valid_flashcards(flashcards):
+    """
+    Yield well-formed flashcards, dropping repeated questions.
+    
+    Shards are generated independently, so the same question can come back
+    from more than one of them; fronts are compared case- and whitespace-insensitively.
+    
+    Args:
+        flashcards (iterable): Flashcards parsed from the model response
+        
+    Yields:
+        dict: Valid, unique flashcards in their original order
+    """
+    seen_fronts = set()
+    for card in flashcards:
+        if not isinstance(card, dict) or "front" not in card or "back" not in card:
+            continue
+        
+        front = " ".join(str(card["front"]).lower().split())
+        if not front or not str(card["back"]).strip() or front in seen_fronts:
+            continue
+        
+        seen_fronts.add(front)
+        yield card
+
+def _select_flashcards(flashcards, num_cards):
+    """
+    Keep well-formed, unique flashcards up to num_cards.
+    
+    Args:
+        flashcards (list): Flashcards parsed from the model response
+        num_cards (int): Maximum number of flashcards to keep
+        
+    Returns:
+        list: Selected flashcards
+    """
+    return list(islice(_iter_valid_flashcards(flashcards), num_cards))
+
+def _parse_flashcards(flashcards_text):
+    """
+    Parse the flashcards out of a JSON model response.
+    
+    Args:
+        flashcards_text (str): Model response
+        
+    Returns:
+        list: Parsed flashcards (empty if the response isn't usable)
+    """
+    try:
+        flashcards_data = loads(extract_json(flashcards_text))
+    except JSONDecodeError:
+        return []
+    
+    # Extract flashcards from the response
+    if isinstance(flashcards_data, dict) and "flashcards" in flashcards_data:
+        flashcards_data = flashcards_data["flashcards"]
+    
+    # If the model didn't use the "flashcards" key, assume the entire object is the array
+    return flashcards_data if isinstance(flashcards_data, list) else []
+
+def _build_user_prompt(video_info, transcript_text, num_cards, focus_area):
+    """Build the user prompt asking for num_cards flashcards about a piece of transcript."""
+    return f"""
+        Video Title: {video_info.get('title', 'Unknown')}
+        Video Channel: {video_info.get('channel', 'Unknown')}
+        
+        Transcript:
+        {transcript_text}
+        
+        Please create {num_cards} flashcards focused on {focus_area.lower()} from this content.
+        """
+
+# Read-only sample flashcards used when the model response can't be used
+_SAMPLE_FLASHCARDS = (
+    MappingProxyType({
+        "front": "What is the main concept discussed in the video?",
+        "back": "The video primarily discusses machine learning algorithms and their applications."
+    }),
+    MappingProxyType({
+        "front": "Define supervised learning as mentioned in the video",
+        "back": "Supervised learning is a machine learning approach where the model is trained on labeled data."
+    }),
+    MappingProxyType({
+        "front": "What example of neural networks was given in the video?",
+        "back": "The video used image recognition systems as an example of neural networks."
+    })
+)
+
+def _fallback_flashcards(num_cards):
+    """Sample flashcards used when the model response can't be used (independent copies)."""
+    return [dict(card) for card in islice(cycle(_SAMPLE_FLASHCARDS), num_cards)]
 
 class FlashcardAgent:
     def __init__(self):
         """Initialize the FlashcardAgent class."""
-        self.adk_manager = GoogleADKManager()
+        self.adk_manager = get_adk_manager()
         
-    def generate_flashcards(self, transcript, video_info, num_cards=10, focus_area="Mixed"):
+    def generate_flashcards(self, transcript, video_info, num_cards=10, focus_area="Mixed", force_refresh=False):
         """
         Generate flashcards based on video transcript.
         
@@ -16,94 +144,166 @@ class FlashcardAgent:
             video_info (dict): Information about the video
             num_cards (int): Number of flashcards to generate
             focus_area (str): Focus area ('Key Concepts', 'Definitions', 'Examples', 'Mixed')
+            force_refresh (bool): Generate a new set even if one is cached for this video
             
         Returns:
             list: List of flashcard dictionaries with front and back content
         """
-        # System prompt for flashcard generation
-        system_prompt = f"""
-        You are an expert educational content creator specializing in effective flashcards. 
-        Your task is to create clear, concise flashcards based on video content.
-        
-        For each flashcard:
-        1. Create a front side with a question or prompt
-        2. Create a back side with the answer or explanation
-        
-        Focus on {focus_area.lower()} from the content.
-        Follow principles of spaced repetition by creating cards that test recall effectively.
-        
-        Format your response as a JSON array of flashcard objects:
-        [
-            {{
-                "front": "Question or prompt on front of card",
-                "back": "Answer or explanation on back of card"
-            }},
-            // more flashcards...
-        ]
-        """
+        # Reuse a set generated earlier for the same video and options
+        cache_key = LLMCache.make_key(self.adk_manager.get_model(), transcript, num_cards, focus_area)
+        if not force_refresh:
+            cached_flashcards = _FLASHCARD_CACHE.get(cache_key)
+            if cached_flashcards is not None:
+                return [dict(card) for card in cached_flashcards]
         
-        user_prompt = f"""
-        Video Title: {video_info.get('title', 'Unknown')}
-        Video Channel: {video_info.get('channel', 'Unknown')}
+        # System prompt for flashcard generation
+        system_prompt = _flashcard_system_prompt(focus_area)
         
-        Transcript:
-        {transcript[:8000]}  # Limit transcript length for API
+        # Sample passages from the whole video rather than only its opening, then group
+        # them into windows that are turned into cards concurrently; shorter prompts
+        # come back faster and the round trips overlap
+        passages = get_transcript_index(transcript).sample_passages(TRANSCRIPT_TOKEN_BUDGET)
+        num_shards = max(1, min(MAX_SHARDS, len(passages)))
+        shards = [
+            "\n".join(passages[len(passages) * i // num_shards:len(passages) * (i + 1) // num_shards])
+            for i in range(num_shards)
+        ]
         
-        Please create {num_cards} flashcards focused on {focus_area.lower()} from this content.
-        """
+        # Spread the requested cards over the shards, dropping shards with nothing to do
+        base_count, remainder = divmod(num_cards, len(shards))
+        shard_requests = []
+        for index, shard in enumerate(shards):
+            shard_cards = base_count + (1 if index < remainder else 0)
+            if shard_cards <= 0:
+                continue
+            
+            shard_requests.append({
+                'prompt': _build_user_prompt(video_info, shard, shard_cards, focus_area),
+                'system_prompt': system_prompt,
+                'response_format': "json",
+                'response_schema': _FLASHCARD_LIST_SCHEMA,
+                'temperature': 0.7
+            })
         
         try:
-            # Use Google ADK API to generate flashcards
-            flashcards_text = self.adk_manager.generate_text(
-                prompt=user_prompt,
-                system_prompt=system_prompt,
-                response_format="json",
-                temperature=0.7
-            )
-            
-            flashcards_data = json.loads(flashcards_text)
+            # Use Google ADK API to generate flashcards for all shards at once
+            flashcards_texts = self.adk_manager.generate_texts(shard_requests, max_workers=MAX_SHARDS)
             
-            # Extract flashcards from the response
-            if "flashcards" in flashcards_data:
-                flashcards = flashcards_data["flashcards"]
-            else:
-                # If the model didn't use the "flashcards" key, assume the entire object is the array
-                flashcards = flashcards_data
+            flashcards = []
+            for flashcards_text in flashcards_texts:
+                # A malformed shard contributes nothing, the others can still be used
+                flashcards.extend(_parse_flashcards(flashcards_text))
             
-            if isinstance(flashcards, list):
+            if flashcards:
                 # Verify that flashcards have the correct format and limit to requested number
-                processed_flashcards = []
-                for card in flashcards[:num_cards]:
-                    if not all(key in card for key in ["front", "back"]):
-                        continue
-                    
-                    processed_flashcards.append(card)
-                
-                return processed_flashcards
+                flashcards = _select_flashcards(flashcards, num_cards)
+                # A short set (e.g. a shard failed) isn't kept, so the next request tries again
+                if len(flashcards) >= num_cards:
+                    _FLASHCARD_CACHE.set(cache_key, flashcards)
+                return [dict(card) for card in flashcards]
             else:
                 # Fallback to mock data if format is incorrect
                 raise ValueError("Response format incorrect")
             
         except Exception as e:
             # Fallback to sample flashcards if there's an error
-            sample_flashcards = [
-                {
-                    "front": "What is the main concept discussed in the video?",
-                    "back": "The video primarily discusses machine learning algorithms and their applications."
-                },
-                {
-                    "front": "Define supervised learning as mentioned in the video",
-                    "back": "Supervised learning is a machine learning approach where the model is trained on labeled data."
-                },
-                {
-                    "front": "What example of neural networks was given in the video?",
-                    "back": "The video used image recognition systems as an example of neural networks."
-                }
-            ]
+            return _fallback_flashcards(num_cards)
+    
+    def generate_flashcards_batch(self, requests):
+        """
+        Generate flashcards for several requests, sharing one model call per video and focus area.
+        
+        Requests for the same transcript and focus area (e.g. "10 cards", then "10 more")
+        are merged into a single call for the combined number of cards, so the transcript
+        is only sent once; the cards are then split between the requests in order.
+        
+        Args:
+            requests (list): Dictionaries with transcript, video_info, num_cards
+                (default 10) and focus_area (default 'Mixed') keys
             
-            # Generate the requested number of flashcards
-            flashcards = sample_flashcards * (num_cards // 3 + 1)
-            return flashcards[:num_cards]
+        Returns:
+            list: One list of flashcard dictionaries per request, in request order
+        """
+        # Group request indexes by (transcript, focus area)
+        groups = {}
+        for index, request in enumerate(requests):
+            key = (request['transcript'], request.get('focus_area', "Mixed"))
+            groups.setdefault(key, []).append(index)
+        
+        group_requests = []
+        for (transcript, focus_area), indexes in groups.items():
+            total_cards = sum(requests[index].get('num_cards', 10) for index in indexes)
+            passages = get_transcript_index(transcript).sample_passages(TRANSCRIPT_TOKEN_BUDGET)
+            group_requests.append({
+                'prompt': _build_user_prompt(
+                    requests[indexes[0]].get('video_info', {}), "\n".join(passages), total_cards, focus_area
+                ),
+                'system_prompt': _flashcard_system_prompt(focus_area),
+                'response_format': "json",
+                'response_schema': _FLASHCARD_LIST_SCHEMA,
+                'temperature': 0.7
+            })
+        
+        # Different videos / focus areas still run concurrently
+        flashcards_texts = self.adk_manager.generate_texts(group_requests, max_workers=MAX_SHARDS)
+        
+        results = [None] * len(requests)
+        for indexes, flashcards_text in zip(groups.values(), flashcards_texts):
+            flashcards = list(_iter_valid_flashcards(_parse_flashcards(flashcards_text)))
+            
+            # Hand out the cards in request order, falling back to sample cards if they run out
+            start = 0
+            for index in indexes:
+                num_cards = requests[index].get('num_cards', 10)
+                cards = flashcards[start:start + num_cards]
+                start += num_cards
+                results[index] = cards if cards else _fallback_flashcards(num_cards)
+        
+        return results
+    
+    def generate_flashcards_stream(self, transcript, video_info, num_cards=10, focus_area="Mixed"):
+        """
+        Generate flashcards, yielding each one as soon as it has been received.
+        
+        Uses a single streamed request and parses the JSON incrementally, so the
+        first card is available long before the whole set has been generated.
+        
+        Args:
+            transcript (str): Video transcript
+            video_info (dict): Information about the video
+            num_cards (int): Number of flashcards to generate
+            focus_area (str): Focus area ('Key Concepts', 'Definitions', 'Examples', 'Mixed')
+            
+        Yields:
+            dict: Flashcard dictionaries with front and back content
+        """
+        passages = get_transcript_index(transcript).sample_passages(TRANSCRIPT_TOKEN_BUDGET)
+        chunks = self.adk_manager.generate_text_stream(
+            prompt=_build_user_prompt(video_info, "\n".join(passages), num_cards, focus_area),
+            system_prompt=_flashcard_system_prompt(focus_area),
+            response_format="json",
+            response_schema=_FLASHCARD_LIST_SCHEMA,
+            temperature=0.7
+        )
+        
+        def parsed_cards():
+            for element in iter_json_elements(chunks):
+                if isinstance(element, tuple):
+                    # The model wrapped the array in an object, e.g. {"flashcards": [...]}
+                    key, value = element
+                    if key == "flashcards" and isinstance(value, list):
+                        yield from value
+                else:
+                    yield element
+        
+        generated = 0
+        for card in islice(_iter_valid_flashcards(parsed_cards()), num_cards):
+            generated += 1
+            yield card
+        
+        if not generated:
+            # Fallback to sample flashcards if nothing usable was received
+            yield from _fallback_flashcards(num_cards)
             
     def organize_by_difficulty(self, flashcards):
         """
@@ -1,19 +1,137 @@
 # filepath: /Users/sanigam/Desktop/Work/hack_jun_2025/components/learning_path_agent.py
-import os
-import json
-from utils.google_adk_manager import GoogleADKManager
+import copy
+import logging
+from itertools import islice
+from typing import Final
+from utils.google_adk_manager import get_adk_manager
+from utils.json_utils import iter_json_elements
+from utils.llm_cache import LLMCache
+from utils.user_store import get_user_store
+from components.schemas import Recommendations, RecommendationUpdate, SCHEMA_VERSION
+
+logger = logging.getLogger(__name__)
+
+# System prompt for personalized recommendations; only the user's profile fields vary
+_RECOMMENDATIONS_SYSTEM_PROMPT: Final[str] = """
+You are an expert educational advisor specializing in personalized learning paths.
+Your task is to create a tailored learning plan based on the user's interests, goals, learning preferences, and current skill level.
+
+Create recommendations that:
+1. Match the user's stated interests
+2. Help achieve their learning goals
+3. Align with their preferred learning style ({learning_style})
+4. Consider their current progress level ({user_progress}%)
+5. Build upon their previous learning (videos they've already watched)
+6. Are appropriate for their skill level: {skill_level}
+7. Account for milestones they've already completed
+"""
+
+# System prompt for updating recommendations
+_UPDATE_SYSTEM_PROMPT: Final[str] = """
+You are an expert educational advisor specializing in personalized learning paths.
+Your task is to update an existing learning path based on new user activity.
+"""
+
+# Basic recommendations used when the model response can't be used
+_FALLBACK_RECOMMENDATIONS: Final[dict] = {
+    'next_steps': [
+        "Start with fundamentals in your area of interest",
+        "Watch introductory videos on the subject",
+        "Practice with simple exercises to reinforce learning",
+        "Join online forums or communities in your field",
+        "Set specific learning goals with deadlines"
+    ],
+    'recommended_videos': [
+        {
+            'id': 'fallback1',
+            'title': 'Introduction to the Subject',
+            'channel': 'Educational Channel',
+            'url': 'https://www.youtube.com/watch?v=example1',
+            'reason': 'Good starting point for beginners',
+            'category': 'General Education',
+            'difficulty': 'Beginner',
+            'duration_minutes': 15
+        },
+        {
+            'id': 'fallback2',
+            'title': 'Core Concepts Explained',
+            'channel': 'Learning Hub',
+            'url': 'https://www.youtube.com/watch?v=example2',
+            'reason': 'Covers essential knowledge',
+            'category': 'General Education',
+            'difficulty': 'Beginner',
+            'duration_minutes': 20
+        }
+    ],
+    'additional_resources': [
+        {
+            'id': 'fallbackres1',
+            'title': 'Beginner\'s Guide',
+            'type': 'Article',
+            'url': 'https://example.com/beginners-guide',
+            'description': 'A comprehensive introduction to the subject',
+            'reason': 'Gives you a solid foundation'
+        },
+        {
+            'id': 'fallbackres2',
+            'title': 'Practice Exercises',
+            'type': 'Website',
+            'url': 'https://example.com/exercises',
+            'description': 'Interactive exercises to practice skills',
+            'reason': 'Hands-on practice is essential for learning'
+        }
+    ],
+    'milestones': [
+        {
+            'id': 'fallbackmile1',
+            'name': 'Basic Understanding',
+            'progress': 50,
+            'objective': 'Grasp fundamental concepts of the subject',
+            'estimated_completion_hours': 5
+        },
+        {
+            'id': 'fallbackmile2',
+            'name': 'Practical Application',
+            'progress': 25,
+            'objective': 'Apply concepts to solve simple problems',
+            'estimated_completion_hours': 10
+        }
+    ],
+    'skill_assessments': [
+        {
+            'skill': 'Subject Knowledge',
+            'current_level': 'Beginner',
+            'next_goal': 'Intermediate understanding',
+            'recommended_practice': 'Complete online quizzes on the topic'
+        }
+    ]
+}
+
+# Activity types that can update the learning path without a model call, and how far
+# a completed video or passed quiz moves a matching milestone forward
+_LOCAL_ACTIVITY_TYPES = frozenset({'video_completed', 'milestone_completed', 'quiz_passed'})
+_PROGRESS_STEP = 20
+
+# Most recent watched videos / completed milestones listed in a prompt
+_PROMPT_HISTORY_LIMIT = 50
+
+# Learning paths generated for a given user profile, reused for a week while the profile is unchanged
+RECOMMENDATIONS_CACHE_TTL = 7 * 24 * 60 * 60
+_RECOMMENDATIONS_CACHE = LLMCache("recommendations", maxsize=128, ttl=RECOMMENDATIONS_CACHE_TTL, persist=True)
 
 class LearningPathAgent:
     def __init__(self):
         """Initialize the LearningPathAgent class."""
-        self.adk_manager = GoogleADKManager()
-        self.user_data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "users")
-        # Ensure user data directory exists
-        os.makedirs(self.user_data_dir, exist_ok=True)
+        self.adk_manager = get_adk_manager()
+        # User data lives in a single SQLite database (legacy per-user JSON files are imported once)
+        self.user_store = get_user_store()
         
-    def generate_recommendations(self, interests=None, goals=None, learning_style=None, user_progress=0, video_history=None, skill_level="Beginner", completed_milestones=None):
+    def generate_recommendations_stream(self, interests=None, goals=None, learning_style=None, user_progress=0, video_history=None, skill_level="Beginner", completed_milestones=None):
         """
-        Generate personalized learning recommendations.
+        Generate personalized learning recommendations, yielding each section as soon as it arrives.
+        
+        Sections come back in prompt order, so next_steps is available long before
+        the rest of the learning path has been generated.
         
         Args:
             interests (list): User's learning interests
@@ -24,8 +142,8 @@ class LearningPathAgent:
             skill_level (str): User's skill level (Beginner, Intermediate, Advanced)
             completed_milestones (list): List of milestones the user has completed
             
-        Returns:
-            dict: Personalized recommendations
+        Yields:
+            tuple: (section name, section value), e.g. ("next_steps", [...])
         """
         if interests is None:
             interests = []
@@ -37,67 +155,20 @@ class LearningPathAgent:
             completed_milestones = []
             
         # System prompt for personalized recommendations
-        system_prompt = f"""
-        You are an expert educational advisor specializing in personalized learning paths.
-        Your task is to create a tailored learning plan based on the user's interests, goals, learning preferences, and current skill level.
-        
-        Create recommendations that:
-        1. Match the user's stated interests
-        2. Help achieve their learning goals
-        3. Align with their preferred learning style ({learning_style if learning_style else 'Visual'})
-        4. Consider their current progress level ({user_progress}%)
-        5. Build upon their previous learning (videos they've already watched)
-        6. Are appropriate for their skill level: {skill_level}
-        7. Account for milestones they've already completed
-        
-        Format your response as a JSON object with the following structure:
-        {{
-            "next_steps": ["Step 1", "Step 2", "Step 3", "Step 4", "Step 5"],
-            "recommended_videos": [
-                {{
-                    "id": "unique_id",
-                    "title": "Video Title",
-                    "channel": "Channel Name",
-                    "url": "Video URL",
-                    "reason": "Reason for recommendation",
-                    "category": "Subject category (e.g., Programming, Math, Physics, etc.)",
-                    "difficulty": "Beginner/Intermediate/Advanced",
-                    "duration_minutes": estimated_duration_in_minutes
-                }},
-                // more videos...
-            ],
-            "additional_resources": [
-                {{
-                    "id": "unique_id",
-                    "title": "Resource Title",
-                    "type": "Book/Article/Course/Tool/Website",
-                    "url": "Resource URL if applicable",
-                    "description": "Brief description of the resource",
-                    "reason": "Why this resource is recommended"
-                }},
-                // more resources...
-            ],
-            "milestones": [
-                {{
-                    "id": "milestone_id",
-                    "name": "Milestone Name",
-                    "progress": progress_percentage,
-                    "objective": "What the user will learn/achieve with this milestone",
-                    "estimated_completion_hours": estimated_hours_to_complete
-                }},
-                // more milestones...
-            ],
-            "skill_assessments": [
-                {{
-                    "skill": "Specific skill name",
-                    "current_level": "Beginner/Intermediate/Advanced",
-                    "next_goal": "Next proficiency goal for this skill",
-                    "recommended_practice": "Specific practice activity"
-                }},
-                // more skill assessments...
-            ]
-        }}
-        """
+        system_prompt = _RECOMMENDATIONS_SYSTEM_PROMPT.format_map({
+            'learning_style': learning_style or 'Visual',
+            'user_progress': user_progress,
+            'skill_level': skill_level
+        })
+        
+        # Only the most recent history is listed, joined without building intermediate lists
+        recent_videos = ', '.join(
+            video.get('title', 'Unknown Video')
+            for video in islice(reversed(video_history), _PROMPT_HISTORY_LIMIT)
+        ) or 'None'
+        recent_milestones = ', '.join(
+            islice(reversed(completed_milestones), _PROMPT_HISTORY_LIMIT)
+        ) or 'None'
         
         user_prompt = f"""
         User Interests: {', '.join(interests) if interests else 'Not specified'}
@@ -107,10 +178,10 @@ class LearningPathAgent:
         Skill Level: {skill_level}
         
         Previously watched videos:
-        {', '.join([video.get('title', 'Unknown Video') for video in video_history]) if video_history else 'None'}
+        {recent_videos}
         
         Completed milestones:
-        {', '.join(completed_milestones) if completed_milestones else 'None'}
+        {recent_milestones}
         
         Please create a comprehensive personalized learning path for this user with:
         1. 3-5 specific next steps to progress their learning
@@ -120,189 +191,60 @@ class LearningPathAgent:
         5. 2-3 skill assessments with current and target skill levels
         """
         
-        try:
-            # Use Google ADK API to generate recommendations
-            recommendations_text = self.adk_manager.generate_text(
-                prompt=user_prompt,
-                system_prompt=system_prompt,
-                response_format="json",
-                temperature=0.7
-            )
-            
-            recommendations = json.loads(recommendations_text)
-            
-            # Ensure we have all expected fields
-            if "next_steps" not in recommendations or not recommendations["next_steps"]:
-                recommendations["next_steps"] = [
-                    "Complete introductory content in your area of interest",
-                    "Practice applying concepts with hands-on exercises",
-                    "Review and solidify your understanding of core concepts",
-                    "Work through a beginner-friendly project",
-                    "Join a community of practice to share your learning"
-                ]
-            
-            if "recommended_videos" not in recommendations or not recommendations["recommended_videos"]:
-                recommendations["recommended_videos"] = [
-                    {
-                        'id': 'video1',
-                        'title': 'Introduction to Machine Learning',
-                        'channel': 'Tech Learning',
-                        'url': 'https://www.youtube.com/watch?v=example1',
-                        'reason': 'Aligns with your learning interests',
-                        'category': 'Computer Science',
-                        'difficulty': skill_level,
-                        'duration_minutes': 15
-                    },
-                    {
-                        'id': 'video2',
-                        'title': 'Neural Networks Explained',
-                        'channel': 'Data Science Basics',
-                        'url': 'https://www.youtube.com/watch?v=example2',
-                        'reason': 'Helps achieve your learning goals',
-                        'category': 'Computer Science',
-                        'difficulty': skill_level,
-                        'duration_minutes': 20
-                    }
-                ]
-            
-            if "additional_resources" not in recommendations:
-                recommendations["additional_resources"] = [
-                    {
-                        'id': 'resource1',
-                        'title': 'Beginner\'s Guide to Data Science',
-                        'type': 'Book',
-                        'url': 'https://example.com/book1',
-                        'description': 'A comprehensive introduction to data science concepts',
-                        'reason': 'Perfect for beginners to build a solid foundation'
-                    },
-                    {
-                        'id': 'resource2',
-                        'title': 'Interactive Python Course',
-                        'type': 'Course',
-                        'url': 'https://example.com/course1',
-                        'description': 'Hands-on Python programming course',
-                        'reason': 'Practical coding experience to reinforce concepts'
-                    }
-                ]
-                
-            if "milestones" not in recommendations or not recommendations["milestones"]:
-                recommendations["milestones"] = [
-                    {
-                        'id': 'milestone1',
-                        'name': 'Beginner Concepts',
-                        'progress': 75,
-                        'objective': 'Understand fundamental principles in your area of interest',
-                        'estimated_completion_hours': 5
-                    },
-                    {
-                        'id': 'milestone2',
-                        'name': 'Intermediate Knowledge',
-                        'progress': 40,
-                        'objective': 'Apply basic concepts to solve practical problems',
-                        'estimated_completion_hours': 10
-                    },
-                    {
-                        'id': 'milestone3',
-                        'name': 'Advanced Applications',
-                        'progress': 10,
-                        'objective': 'Develop expertise in specific advanced topics',
-                        'estimated_completion_hours': 15
-                    }
-                ]
-                
-            if "skill_assessments" not in recommendations:
-                recommendations["skill_assessments"] = [
-                    {
-                        'skill': 'Basic Understanding',
-                        'current_level': skill_level,
-                        'next_goal': 'Intermediate proficiency',
-                        'recommended_practice': 'Complete a small project applying the concepts'
-                    },
-                    {
-                        'skill': 'Practical Application',
-                        'current_level': skill_level,
-                        'next_goal': 'Consistent problem-solving ability',
-                        'recommended_practice': 'Solve practice exercises related to the topic'
-                    }
-                ]
-            
-            return recommendations
+        # Use Google ADK API to generate recommendations, parsing the JSON as it streams in;
+        # the schema constrains the output
+        chunks = self.adk_manager.generate_text_stream(
+            prompt=user_prompt,
+            system_prompt=system_prompt,
+            response_format="json",
+            temperature=0.7,
+            response_schema=Recommendations
+        )
+        
+        for section in iter_json_elements(chunks):
+            if isinstance(section, tuple):
+                yield section
+    
+    def generate_recommendations(self, interests=None, goals=None, learning_style=None, user_progress=0, video_history=None, skill_level="Beginner", completed_milestones=None, force_refresh=False):
+        """
+        Generate personalized learning recommendations.
+        
+        Args:
+            interests (list): User's learning interests
+            goals (str): User's learning goals
+            learning_style (str): User's preferred learning style
+            user_progress (int): User's current progress (0-100)
+            video_history (list): List of previously watched videos
+            skill_level (str): User's skill level (Beginner, Intermediate, Advanced)
+            completed_milestones (list): List of milestones the user has completed
+            force_refresh (bool): Generate a new learning path even if one is cached for this profile
             
-        except Exception as e:
-            # Fallback to basic recommendations if there's an error
-            return {
-                'next_steps': [
-                    "Start with fundamentals in your area of interest",
-                    "Watch introductory videos on the subject",
-                    "Practice with simple exercises to reinforce learning",
-                    "Join online forums or communities in your field",
-                    "Set specific learning goals with deadlines"
-                ],
-                'recommended_videos': [
-                    {
-                        'id': 'fallback1',
-                        'title': 'Introduction to the Subject',
-                        'channel': 'Educational Channel',
-                        'url': 'https://www.youtube.com/watch?v=example1',
-                        'reason': 'Good starting point for beginners',
-                        'category': 'General Education',
-                        'difficulty': 'Beginner',
-                        'duration_minutes': 15
-                    },
-                    {
-                        'id': 'fallback2',
-                        'title': 'Core Concepts Explained',
-                        'channel': 'Learning Hub',
-                        'url': 'https://www.youtube.com/watch?v=example2',
-                        'reason': 'Covers essential knowledge',
-                        'category': 'General Education',
-                        'difficulty': 'Beginner',
-                        'duration_minutes': 20
-                    }
-                ],
-                'additional_resources': [
-                    {
-                        'id': 'fallbackres1',
-                        'title': 'Beginner\'s Guide',
-                        'type': 'Article',
-                        'url': 'https://example.com/beginners-guide',
-                        'description': 'A comprehensive introduction to the subject',
-                        'reason': 'Gives you a solid foundation'
-                    },
-                    {
-                        'id': 'fallbackres2',
-                        'title': 'Practice Exercises',
-                        'type': 'Website',
-                        'url': 'https://example.com/exercises',
-                        'description': 'Interactive exercises to practice skills',
-                        'reason': 'Hands-on practice is essential for learning'
-                    }
-                ],
-                'milestones': [
-                    {
-                        'id': 'fallbackmile1',
-                        'name': 'Basic Understanding',
-                        'progress': 50,
-                        'objective': 'Grasp fundamental concepts of the subject',
-                        'estimated_completion_hours': 5
-                    },
-                    {
-                        'id': 'fallbackmile2',
-                        'name': 'Practical Application',
-                        'progress': 25,
-                        'objective': 'Apply concepts to solve simple problems',
-                        'estimated_completion_hours': 10
-                    }
-                ],
-                'skill_assessments': [
-                    {
-                        'skill': 'Subject Knowledge',
-                        'current_level': 'Beginner',
-                        'next_goal': 'Intermediate understanding',
-                        'recommended_practice': 'Complete online quizzes on the topic'
-                    }
-                ]
-            }
+        Returns:
+            dict: Personalized recommendations
+        """
+        # Identical profiles get the same learning path without another model call
+        cache_key = LLMCache.make_key(
+            self.adk_manager.get_model(), SCHEMA_VERSION, interests, goals, learning_style, user_progress,
+            [video.get('title', 'Unknown Video') for video in video_history or []],
+            skill_level, completed_milestones
+        )
+        if not force_refresh:
+            cached_recommendations = _RECOMMENDATIONS_CACHE.get(cache_key)
+            if cached_recommendations is not None:
+                return copy.deepcopy(cached_recommendations)
+        
+        try:
+            recommendations = Recommendations.model_validate(dict(self.generate_recommendations_stream(
+                interests, goals, learning_style, user_progress,
+                video_history, skill_level, completed_milestones
+            ))).model_dump()
+            _RECOMMENDATIONS_CACHE.set(cache_key, recommendations)
+            return copy.deepcopy(recommendations)
+            
+        except Exception:
+            # Fallback to basic recommendations if the response doesn't match the schema
+            # or the stream broke off
+            return copy.deepcopy(_FALLBACK_RECOMMENDATIONS)
             
     def save_user_data(self, email, user_settings, learning_path):
         """
@@ -320,23 +262,12 @@ class LearningPathAgent:
             return False
             
         try:
-            # Create a sanitized filename from email
-            filename = email.replace('@', '_at_').replace('.', '_dot_') + '.json'
-            file_path = os.path.join(self.user_data_dir, filename)
-            
-            user_data = {
-                'email': email,
-                'settings': user_settings,
-                'learning_path': learning_path,
-                'auth_source': user_settings.get('auth_source', 'direct')
-            }
-            
-            with open(file_path, 'w') as f:
-                json.dump(user_data, f, indent=2)
-                
+            self.user_store.upsert(
+                email, user_settings, learning_path, user_settings.get('auth_source', 'direct')
+            )
             return True
         except Exception as e:
-            print(f"Error saving user data: {str(e)}")
+            logger.warning("Error saving user data: %s", e)
             return False
     
     def load_user_data(self, email):
@@ -353,19 +284,9 @@ class LearningPathAgent:
             return None
             
         try:
-            # Create a sanitized filename from email
-            filename = email.replace('@', '_at_').replace('.', '_dot_') + '.json'
-            file_path = os.path.join(self.user_data_dir, filename)
-            
-            if not os.path.exists(file_path):
-                return None
-                
-            with open(file_path, 'r') as f:
-                user_data = json.load(f)
-                
-            return user_data
+            return self.user_store.get(email)
         except Exception as e:
-            print(f"Error loading user data: {str(e)}")
+            logger.warning("Error loading user data: %s", e)
             return None
     
     def is_auth_email(self, user_settings):
@@ -410,26 +331,13 @@ class LearningPathAgent:
             return False, "Email cannot be changed for accounts authenticated through Google/IAP."
             
         try:
-            # Load existing user data
-            user_data = self.load_user_data(old_email)
-            if not user_data:
-                return False, "User data not found."
-                
-            # Update email in user_data
-            user_data['email'] = new_email
+            # Move the user's row to the new email in a single update
             user_settings['email'] = new_email
-            
-            # Save with new email
-            success = self.save_user_data(new_email, user_settings, user_data.get('learning_path', {}))
-            if not success:
+            if not self.user_store.rename(old_email, new_email, user_settings):
+                if self.load_user_data(old_email) is None:
+                    return False, "User data not found."
                 return False, "Failed to save user data with new email."
                 
-            # Remove old file
-            old_filename = old_email.replace('@', '_at_').replace('.', '_dot_') + '.json'
-            old_file_path = os.path.join(self.user_data_dir, old_filename)
-            if os.path.exists(old_file_path):
-                os.remove(old_file_path)
-                
             return True, "Email updated successfully."
             
         except Exception as e:
@@ -471,6 +379,59 @@ class LearningPathAgent:
         
         return new_user_data
     
+    def update_recommendations_stream(self, current_recommendations, new_activity):
+        """
+        Update recommendations based on new user activity, yielding each section as soon as it arrives.
+        
+        Args:
+            current_recommendations (dict): Current recommendations
+            new_activity (dict): New user activity data
+            
+        Yields:
+            tuple: (section name, section value), e.g. ("next_steps", [...])
+        """
+        # Extract current recommendations
+        current_next_steps = current_recommendations.get('next_steps', [])
+        current_videos = current_recommendations.get('recommended_videos', [])
+        current_milestones = current_recommendations.get('milestones', [])
+        
+        # Format activity information
+        activity_type = new_activity.get('type', '')
+        activity_data = new_activity.get('data', {})
+        
+        # Prepare the user prompt
+        user_prompt = f"""
+        Current Learning Path:
+        - Next Steps: {', '.join(current_next_steps)}
+        - Recommended Videos: {', '.join(v.get('title', 'Unknown') for v in current_videos)}
+        - Milestones: {', '.join(f"{m.get('name', 'Unknown')}: {m.get('progress', 0)}%" for m in current_milestones)}
+        
+        New User Activity:
+        - Activity Type: {activity_type}
+        - Details: {activity_data}
+        
+        Please update the learning path based on this new activity. For example:
+        - If they completed a video, mark related milestone progress higher
+        - If they started a new topic, suggest more videos on that topic
+        - If they're struggling, suggest more fundamental content
+        
+        Return the updated learning path.
+        """
+        
+        # Use Google ADK API to update recommendations, parsing the JSON as it streams in;
+        # the schema constrains the output
+        chunks = self.adk_manager.generate_text_stream(
+            prompt=user_prompt,
+            system_prompt=_UPDATE_SYSTEM_PROMPT,
+            response_format="json",
+            temperature=0.5,
+            response_schema=RecommendationUpdate
+        )
+        
+        for section in iter_json_elements(chunks):
+            if isinstance(section, tuple):
+                yield section
+    
     def update_recommendations(self, current_recommendations, new_activity):
         """
         Update recommendations based on new user activity.
@@ -482,86 +443,58 @@ class LearningPathAgent:
         Returns:
             dict: Updated recommendations
         """
+        # Simple progress events are applied directly instead of asking the model
+        if new_activity.get('type') in _LOCAL_ACTIVITY_TYPES and not new_activity.get('notes'):
+            updated_recommendations = self._apply_activity_locally(current_recommendations, new_activity)
+            if updated_recommendations is not None:
+                return updated_recommendations
+        
         try:
-            # System prompt for updating recommendations
-            system_prompt = """
-            You are an expert educational advisor specializing in personalized learning paths.
-            Your task is to update an existing learning path based on new user activity.
-            
-            Format your response as a JSON object with the same structure as the input recommendations:
-            {
-                "next_steps": ["Step 1", "Step 2", "Step 3", "Step 4", "Step 5"],
-                "recommended_videos": [
-                    {
-                        "id": "unique_id",
-                        "title": "Video Title",
-                        "channel": "Channel Name",
-                        "url": "Video URL",
-                        "reason": "Reason for recommendation"
-                    },
-                    // more videos...
-                ],
-                "milestones": [
-                    {
-                        "name": "Milestone Name",
-                        "progress": progress_percentage
-                    },
-                    // more milestones...
-                ]
-            }
-            """
-            
-            # Extract current recommendations
-            current_next_steps = current_recommendations.get('next_steps', [])
-            current_videos = current_recommendations.get('recommended_videos', [])
-            current_milestones = current_recommendations.get('milestones', [])
-            
-            # Format activity information
-            activity_type = new_activity.get('type', '')
-            activity_data = new_activity.get('data', {})
-            
-            # Prepare the user prompt
-            user_prompt = f"""
-            Current Learning Path:
-            - Next Steps: {', '.join(current_next_steps)}
-            - Recommended Videos: {', '.join([v.get('title', 'Unknown') for v in current_videos])}
-            - Milestones: {', '.join([f"{m.get('name', 'Unknown')}: {m.get('progress', 0)}%" for m in current_milestones])}
-            
-            New User Activity:
-            - Activity Type: {activity_type}
-            - Details: {activity_data}
-            
-            Please update the learning path based on this new activity. For example:
-            - If they completed a video, mark related milestone progress higher
-            - If they started a new topic, suggest more videos on that topic
-            - If they're struggling, suggest more fundamental content
-            
-            Return the updated learning path.
-            """
-            
-            # Use Google ADK API to update recommendations
-            updated_recommendations_text = self.adk_manager.generate_text(
-                prompt=user_prompt,
-                system_prompt=system_prompt,
-                response_format="json",
-                temperature=0.5
+            updated_recommendations = RecommendationUpdate.model_validate(
+                dict(self.update_recommendations_stream(current_recommendations, new_activity))
             )
-            
-            updated_recommendations = json.loads(updated_recommendations_text)
-            
-            # Ensure we have all expected fields
-            if "next_steps" not in updated_recommendations:
-                updated_recommendations["next_steps"] = current_next_steps
-            
-            if "recommended_videos" not in updated_recommendations:
-                updated_recommendations["recommended_videos"] = current_videos
-                
-            if "milestones" not in updated_recommendations:
-                updated_recommendations["milestones"] = current_milestones
-                
-            return updated_recommendations
+            return updated_recommendations.model_dump()
             
         except Exception as e:
-            # Return original recommendations if update fails
-            print(f"Error updating recommendations: {str(e)}")
+            # Return original recommendations if the update fails for any reason
+            # (schema mismatch, broken stream, unexpected response shape)
+            logger.warning("Error updating recommendations: %s", e)
             return current_recommendations
+    
+    def _apply_activity_locally(self, current_recommendations, new_activity):
+        """
+        Apply a mechanical progress event to the milestones without calling the model.
+        
+        - milestone_completed: the matching milestone (by id or name) is set to 100%
+        - video_completed / quiz_passed: milestones whose name mentions the video's or
+          quiz's category (or topic) move forward by up to 20 points
+        
+        Args:
+            current_recommendations (dict): Current recommendations
+            new_activity (dict): New user activity data
+            
+        Returns:
+            dict: Updated copy of the recommendations, or None if no milestone matched
+        """
+        activity_type = new_activity.get('type')
+        activity_data = new_activity.get('data') or {}
+        updated_recommendations = copy.deepcopy(current_recommendations)
+        milestones = updated_recommendations.get('milestones') or []
+        
+        matched = False
+        if activity_type == 'milestone_completed':
+            milestone_ids = {activity_data.get('id'), activity_data.get('name')} - {None}
+            for milestone in milestones:
+                if milestone.get('id') in milestone_ids or milestone.get('name') in milestone_ids:
+                    milestone['progress'] = 100
+                    matched = True
+        else:
+            subject = (activity_data.get('category') or activity_data.get('topic') or '').strip().lower()
+            if subject:
+                for milestone in milestones:
+                    if subject in str(milestone.get('name', '')).lower():
+                        progress = milestone.get('progress') or 0
+                        milestone['progress'] = progress + min(_PROGRESS_STEP, 100 - progress)
+                        matched = True
+        
+        return updated_recommendations if matched else None
@@ -1,13 +1,57 @@
 import os
-import json
-from utils.google_adk_manager import GoogleADKManager
+import copy
+from itertools import cycle, islice
+from typing import Final
+from utils.google_adk_manager import get_adk_manager
+from utils.llm_cache import LLMCache
+from utils.transcript_index import excerpt_by_tokens
+from components.schemas import Quiz, SCHEMA_VERSION
+
+# System prompt for quiz generation; only the difficulty varies
+_QUIZ_SYSTEM_PROMPT: Final[str] = """
+You are an expert educational quiz creator. Your task is to create engaging, 
+informative multiple-choice questions based on video content.
+
+For each question:
+1. Create a clear, concise question
+2. Provide 4 possible answers as an array of strings
+3. Indicate which answer is correct (the exact string from the options array)
+4. Provide brief explanatory feedback for correct and incorrect answers
+
+Adapt the questions to be {difficulty_lower} difficulty level.
+"""
+
+# Sample questions used when the model response can't be used
+_SAMPLE_QUESTIONS: Final[list] = [
+    {
+        "question": "What is the main concept discussed in the video?",
+        "options": ["Option A", "Option B", "Option C", "Option D"],
+        "correct_answer": "Option B",
+        "correct_feedback": "That's correct! The video primarily focuses on Option B.",
+        "incorrect_feedback": "Not quite. The video primarily discusses Option B."
+    },
+    {
+        "question": "According to the video, which technique is most effective?",
+        "options": ["Technique 1", "Technique 2", "Technique 3", "Technique 4"],
+        "correct_answer": "Technique 3",
+        "correct_feedback": "Correct! The video demonstrates that Technique 3 is most effective.",
+        "incorrect_feedback": "Actually, the video specifically shows Technique 3 to be most effective."
+    }
+]
+
+# Approximate token budget for the transcript sent with a quiz request
+QUIZ_TRANSCRIPT_TOKENS = 6000
+
+# Generated quizzes, reused for retakes of the same video and settings for 30 days
+QUIZ_CACHE_TTL = 30 * 24 * 60 * 60
+_QUIZ_CACHE = LLMCache("quiz", maxsize=64, ttl=QUIZ_CACHE_TTL, persist=True)
 
 class QuizAgent:
     def __init__(self):
         """Initialize the QuizAgent class."""
-        self.adk_manager = GoogleADKManager()
+        self.adk_manager = get_adk_manager()
         
-    def generate_quiz(self, transcript, video_info, num_questions=5, difficulty="Medium"):
+    def generate_quiz(self, transcript, video_info, num_questions=5, difficulty="Medium", force_refresh=False):
         """
         Generate quiz questions based on video transcript.
         
@@ -16,100 +60,54 @@ class QuizAgent:
             video_info (dict): Information about the video
             num_questions (int): Number of questions to generate
             difficulty (str): Difficulty level ('Easy', 'Medium', 'Hard')
+            force_refresh (bool): Generate a new quiz even if one is cached for this video
             
         Returns:
             list: List of question dictionaries
         """
-        # System prompt for quiz generation
-        system_prompt = f"""
-        You are an expert educational quiz creator. Your task is to create engaging, 
-        informative multiple-choice questions based on video content.
-        
-        For each question:
-        1. Create a clear, concise question
-        2. Provide 4 possible answers as an array of strings
-        3. Indicate which answer is correct (the exact string from the options array)
-        4. Provide brief explanatory feedback for correct and incorrect answers
-        
-        Adapt the questions to be {difficulty.lower()} difficulty level.
+        # Reuse a quiz generated earlier for the same transcript and options
+        cache_key = LLMCache.make_key(
+            self.adk_manager.get_model(), SCHEMA_VERSION, transcript, num_questions, difficulty
+        )
+        if not force_refresh:
+            cached_questions = _QUIZ_CACHE.get(cache_key)
+            if cached_questions is not None:
+                return copy.deepcopy(cached_questions)
         
-        Format your response as a JSON array of question objects, where each object has the following structure:
-        [
-            {{
-                "question": "Question text here?",
-                "options": ["Option A", "Option B", "Option C", "Option D"],
-                "correct_answer": "Option B",
-                "correct_feedback": "Feedback for correct answer",
-                "incorrect_feedback": "Feedback for incorrect answer"
-            }},
-            // more questions...
-        ]
-        """
+        # System prompt for quiz generation
+        system_prompt = _QUIZ_SYSTEM_PROMPT.format_map({'difficulty_lower': difficulty.lower()})
         
         user_prompt = f"""
         Video Title: {video_info.get('title', 'Unknown')}
         Video Channel: {video_info.get('channel', 'Unknown')}
         
         Transcript:
-        {transcript[:8000]}  # Limit transcript length for API
+        {excerpt_by_tokens(transcript, QUIZ_TRANSCRIPT_TOKENS)}
         
         Please create {num_questions} {difficulty.lower()} difficulty multiple-choice questions based on this content.
         """
         
         try:
-            # Use Google ADK API to generate quiz questions
+            # Use Google ADK API to generate quiz questions; the schema constrains the output
             questions_text = self.adk_manager.generate_text(
                 prompt=user_prompt,
                 system_prompt=system_prompt,
                 response_format="json",
-                temperature=0.7
+                temperature=0.7,
+                response_schema=Quiz
             )
             
-            questions_data = json.loads(questions_text)
-            
-            # Extract questions from the response
-            if "questions" in questions_data:
-                questions = questions_data["questions"]
-            else:
-                # If the model didn't use the "questions" key, assume the entire object is the array
-                questions = questions_data
-            
-            if isinstance(questions, list):
-                # Verify that questions have the correct format
-                processed_questions = []
-                for q in questions[:num_questions]:
-                    if not all(key in q for key in ["question", "options", "correct_answer", "correct_feedback", "incorrect_feedback"]):
-                        continue
-                    
-                    processed_questions.append(q)
-                
-                return processed_questions
-            else:
-                # Fallback to mock data if format is incorrect
-                raise ValueError("Response format incorrect")
+            quiz = Quiz.model_validate_json(questions_text)
+            questions = [question.model_dump() for question in quiz.questions[:num_questions]]
+            # A short quiz isn't kept, so the next request tries again
+            if len(questions) >= num_questions:
+                _QUIZ_CACHE.set(cache_key, questions)
+            return copy.deepcopy(questions)
             
-        except Exception as e:
-            # Fallback to sample questions if there's an error
-            sample_questions = [
-                {
-                    "question": "What is the main concept discussed in the video?",
-                    "options": ["Option A", "Option B", "Option C", "Option D"],
-                    "correct_answer": "Option B",
-                    "correct_feedback": "That's correct! The video primarily focuses on Option B.",
-                    "incorrect_feedback": "Not quite. The video primarily discusses Option B."
-                },
-                {
-                    "question": "According to the video, which technique is most effective?",
-                    "options": ["Technique 1", "Technique 2", "Technique 3", "Technique 4"],
-                    "correct_answer": "Technique 3",
-                    "correct_feedback": "Correct! The video demonstrates that Technique 3 is most effective.",
-                    "incorrect_feedback": "Actually, the video specifically shows Technique 3 to be most effective."
-                }
-            ]
-            
-            # Generate the requested number of questions
-            questions = sample_questions * (num_questions // 2 + 1)
-            return questions[:num_questions]
+        except Exception:
+            # Fallback to sample questions if the response doesn't match the schema
+            # or the request failed
+            return [copy.deepcopy(question) for question in islice(cycle(_SAMPLE_QUESTIONS), num_questions)]
             
     def evaluate_answer(self, question, user_answer):
         """
@@ -122,11 +120,26 @@ class QuizAgent:
         Returns:
             dict: Evaluation results
         """
-        correct = user_answer == question['correct_answer']
-        
-        feedback = question['correct_feedback'] if correct else question['incorrect_feedback']
+        return self.evaluate_answers([question], [user_answer])[0]
+    
+    def evaluate_answers(self, questions, user_answers):
+        """
+        Evaluate a user's answers to a whole quiz in one pass.
         
-        return {
-            'correct': correct,
-            'feedback': feedback
-        }
+        Args:
+            questions (list): Question information, in quiz order
+            user_answers (list): User's answers, one per question (None if unanswered)
+            
+        Returns:
+            list: Evaluation results (correct, feedback) for each question
+        """
+        return [
+            {
+                'correct': True,
+                'feedback': question.get('correct_feedback', "Great job! That's correct.")
+            } if user_answer == question['correct_answer'] else {
+                'correct': False,
+                'feedback': question.get('incorrect_feedback', f"The correct answer is: {question['correct_answer']}")
+            }
+            for question, user_answer in zip(questions, user_answers)
+        ]
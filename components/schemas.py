@@ -0,0 +1,92 @@
+from typing import List
+from pydantic import BaseModel
+
+# Structured-output schemas passed to Gemini as response_schema, so the model
+# returns conformant JSON instead of being told the format in the prompt
+
+# Bump when a schema changes so cached responses in the old shape are not reused
+SCHEMA_VERSION = 1
+
+class RecommendedVideo(BaseModel):
+    """A video recommended as part of a learning path."""
+    id: str
+    title: str
+    channel: str
+    url: str
+    reason: str
+    category: str
+    difficulty: str
+    duration_minutes: int
+
+class Resource(BaseModel):
+    """A learning resource beyond videos (book, article, course, tool or website)."""
+    id: str
+    title: str
+    type: str
+    url: str
+    description: str
+    reason: str
+
+class Milestone(BaseModel):
+    """A learning milestone with its progress and objective."""
+    id: str
+    name: str
+    progress: int
+    objective: str
+    estimated_completion_hours: int
+
+class SkillAssessment(BaseModel):
+    """Current and target level for one skill."""
+    skill: str
+    current_level: str
+    next_goal: str
+    recommended_practice: str
+
+class Recommendations(BaseModel):
+    """A personalized learning path."""
+    next_steps: List[str]
+    recommended_videos: List[RecommendedVideo]
+    additional_resources: List[Resource]
+    milestones: List[Milestone]
+    skill_assessments: List[SkillAssessment]
+
+class RecommendationUpdate(BaseModel):
+    """The parts of a learning path revised after new user activity."""
+    next_steps: List[str]
+    recommended_videos: List[RecommendedVideo]
+    milestones: List[Milestone]
+
+class QuizQuestion(BaseModel):
+    """A multiple-choice quiz question with feedback."""
+    question: str
+    options: List[str]
+    correct_answer: str
+    correct_feedback: str
+    incorrect_feedback: str
+
+class Quiz(BaseModel):
+    """A set of quiz questions."""
+    questions: List[QuizQuestion]
+
+class Flashcard(BaseModel):
+    """A flashcard with a question or prompt on the front and the answer on the back."""
+    front: str
+    back: str
+
+class Overview(BaseModel):
+    """A brief overview of a video."""
+    description: str
+    primary_topic: str
+    target_audience: str
+    content_type: str
+
+class Summary(BaseModel):
+    """A video summary with its key points and main topics."""
+    summary_text: str
+    key_points: List[str]
+    topics: List[str]
+
+class OverviewAndSummary(BaseModel):
+    """An overview and a summary of the same video, generated together."""
+    overview: Overview
+    summary: Summary
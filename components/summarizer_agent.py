@@ -1,19 +1,174 @@
 import os
-import json
-from utils.google_adk_manager import GoogleADKManager
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Final
+from pydantic import ValidationError
+from utils.google_adk_manager import DEFAULT_MODEL, get_adk_manager
+from utils.json_utils import iter_json_elements
+from utils.llm_cache import LLMCache
+from utils.transcript_index import head_by_tokens, sample_by_tokens
+from components.schemas import Overview, OverviewAndSummary, Summary, SCHEMA_VERSION
+
+logger = logging.getLogger(__name__)
+
+# System prompt for the brief overview shown when a video is processed
+_OVERVIEW_SYSTEM_PROMPT: Final[str] = """
+You are an expert educational content analyzer. Your task is to create a brief overview of a video 
+based on its transcript. Focus on identifying what the video is about in a succinct manner.
+
+Create an overview with these components:
+1. A 1-2 sentence description of what the video covers
+2. The primary topic of the video
+3. The likely target audience
+4. The content type (educational, tutorial, documentary, etc.)
+
+Be concise and informative.
+"""
+
+# System prompt for summaries; only the length settings vary
+_SUMMARY_SYSTEM_PROMPT: Final[str] = """
+You are an expert educational content summarizer. Your task is to create a clear, insightful summary 
+of a video transcript. Focus on the main ideas and key takeaways.
+
+Create a summary with these components:
+1. A summary text of approximately {max_length} words
+2. {num_key_points} key points from the video
+3. A list of main topics covered
+
+The summary should be informative and capture the essence of the educational content.
+"""
+
+# System prompt for refining a summary with user feedback
+_REFINE_SYSTEM_PROMPT: Final[str] = """
+You are an expert educational content summarizer. Your task is to refine an existing summary
+based on user feedback. Incorporate the feedback while maintaining clarity and conciseness.
+"""
+
+# Summary length settings: (approximate words, number of key points)
+_SUMMARY_LENGTHS: Final[dict] = {
+    "Concise": (150, 3),
+    "Moderate": (300, 5),
+    "Comprehensive": (500, 8)
+}
+
+# Returned when a summary response can't be used
+_INVALID_SUMMARY_RESPONSE: Final[dict] = {
+    'summary_text': "Unable to generate summary: Invalid response format.",
+    'key_points': [
+        "Error parsing AI response",
+        "The response did not match the expected format"
+    ],
+    'topics': ["Error: Response Formatting Issue"]
+}
+
+# Approximate token budgets for the transcript: an overview sees a sample of the
+# beginning and middle, a summary sees the beginning of the transcript
+OVERVIEW_SAMPLE_TOKENS = 450
+SUMMARY_TRANSCRIPT_TOKENS = 1600
+
+# Generated overviews and summaries (the latter also filled ahead of time when a
+# video is processed), and summaries refined with a given piece of feedback.
+# All three are kept on disk for 30 days, like flashcard sets
+SUMMARY_CACHE_TTL = 30 * 24 * 60 * 60
+_OVERVIEW_CACHE = LLMCache("overviews", maxsize=64, ttl=SUMMARY_CACHE_TTL, persist=True)
+_SUMMARY_CACHE = LLMCache("summaries", maxsize=64, ttl=SUMMARY_CACHE_TTL, persist=True)
+_REFINE_CACHE = LLMCache("refined_summaries", maxsize=64, ttl=SUMMARY_CACHE_TTL, persist=True)
+
+# Summaries are drafted with the smaller model only while the default model is selected,
+# unless drafting is turned on for every model with SUMMARY_CHEAP_DRAFTS=1
+CHEAP_SUMMARY_DRAFTS = os.getenv("SUMMARY_CHEAP_DRAFTS", "").lower() in ("1", "true", "yes")
+
+@lru_cache(maxsize=8)
+def _summary_system_prompt(summary_length):
+    """Build the summary system prompt for a summary length (one of a handful of values)."""
+    max_length, num_key_points = _SUMMARY_LENGTHS.get(summary_length, _SUMMARY_LENGTHS["Moderate"])
+    return _SUMMARY_SYSTEM_PROMPT.format(max_length=max_length, num_key_points=num_key_points)
+
+def _overview_transcript_sample(transcript):
+    """Sample the beginning and middle of a long transcript for an overview."""
+    return sample_by_tokens(transcript, OVERVIEW_SAMPLE_TOKENS)
+
+def _summary_transcript_chunk(transcript):
+    """Cut a long transcript down to the part sent for a summary."""
+    # Use the first chunk, which likely contains the most important information
+    transcript_chunk, truncated = head_by_tokens(transcript, SUMMARY_TRANSCRIPT_TOKENS)
+    if truncated:
+        return transcript_chunk + "\n[Note: This is a portion of the full transcript due to length constraints]"
+    return transcript_chunk
+
+def _overview_cache_key(model_name, transcript, video_info):
+    """Cache key for an overview; the transcript itself identifies the content."""
+    return LLMCache.make_key(model_name, SCHEMA_VERSION, video_info.get('id'), transcript)
+
+def _summary_cache_key(model_name, transcript, video_info, summary_length):
+    """Cache key for a summary; the transcript itself identifies the content."""
+    return LLMCache.make_key(
+        model_name, SCHEMA_VERSION, video_info.get('id'), transcript, summary_length
+    )
+
+def _summary_request(transcript, video_info, summary_length, model_name=None):
+    """Build the generate_text keyword arguments for a summary."""
+    user_prompt = f"""
+        Video Title: {video_info.get('title', 'Unknown')}
+        Video Channel: {video_info.get('channel', 'Unknown')}
+        
+        Transcript:
+        {_summary_transcript_chunk(transcript)}
+        
+        Please provide a {summary_length.lower()} summary of this video content.
+        """
+    return {
+        'prompt': user_prompt,
+        'system_prompt': _summary_system_prompt(summary_length),
+        'response_format': "json",
+        'response_schema': Summary,
+        'temperature': 0.2,
+        'model_name': model_name
+    }
+
+def _summary_is_complete(summary, summary_length):
+    """Check that a draft summary has at least half the requested words and all key points."""
+    max_length, num_key_points = _SUMMARY_LENGTHS.get(summary_length, _SUMMARY_LENGTHS["Moderate"])
+    return (
+        len(summary['summary_text'].split()) >= max_length // 2
+        and len(summary['key_points']) >= num_key_points
+    )
+
+def _summary_from_response(summary_text, cache_key):
+    """
+    Validate a summary response against the schema, caching it if it conforms.
+    
+    Args:
+        summary_text (str): Model response
+        cache_key (str): Cache key for the summary
+        
+    Returns:
+        dict: Summary, or a structured error response if the response doesn't match the schema
+    """
+    try:
+        summary = Summary.model_validate_json(summary_text).model_dump()
+    except ValidationError as e:
+        logger.warning("Summary response doesn't match the schema: %s", e)
+        return copy.deepcopy(_INVALID_SUMMARY_RESPONSE)
+    
+    _SUMMARY_CACHE.set(cache_key, summary)
+    return copy.deepcopy(summary)
 
 class SummarizerAgent:
     def __init__(self):
         """Initialize the SummarizerAgent class."""
-        self.adk_manager = GoogleADKManager()
+        self.adk_manager = get_adk_manager()
         
-    def generate_overview(self, transcript, video_info):
+    def generate_overview(self, transcript, video_info, force_refresh=False):
         """
         Generate a brief overview of the video content.
         
         Args:
             transcript (str): Video transcript
             video_info (dict): Information about the video
+            force_refresh (bool): Skip the cache and regenerate the overview
             
         Returns:
             dict: Overview information including brief description and primary topic
@@ -35,45 +190,21 @@ class SummarizerAgent:
                 'content_type': "Unknown"
             }
         
-        # Create prompt for overview generation
-        system_prompt = """
-        You are an expert educational content analyzer. Your task is to create a brief overview of a video 
-        based on its transcript. Focus on identifying what the video is about in a succinct manner.
-        
-        Create an overview with these components:
-        1. A 1-2 sentence description of what the video covers
-        2. The primary topic of the video
-        3. The likely target audience
-        4. The content type (educational, tutorial, documentary, etc.)
-        
-        Format your response as a JSON object with the following structure:
-        {
-            "description": "Brief description of the video content...",
-            "primary_topic": "Main topic of the video",
-            "target_audience": "Who this video is for",
-            "content_type": "Type of content"
-        }
-        
-        Be concise and informative.
-        """
+        cache_key = _overview_cache_key(self.adk_manager.get_model(), transcript, video_info)
+        if not force_refresh:
+            cached_overview = _OVERVIEW_CACHE.get(cache_key)
+            if cached_overview is not None:
+                return dict(cached_overview)
         
-        # Handle large transcripts by taking a sample from beginning and middle
-        MAX_CHUNK_SIZE = 2000
-        if len(transcript) > MAX_CHUNK_SIZE:
-            # Take some from beginning and middle
-            beginning = transcript[:int(MAX_CHUNK_SIZE*0.7)]
-            middle_start = int(len(transcript)/2) - int(MAX_CHUNK_SIZE*0.15)
-            middle = transcript[middle_start:middle_start+int(MAX_CHUNK_SIZE*0.3)]
-            transcript_sample = beginning + "..." + middle
-        else:
-            transcript_sample = transcript
+        # Create prompt for overview generation
+        system_prompt = _OVERVIEW_SYSTEM_PROMPT
         
         user_prompt = f"""
         Video Title: {video_info.get('title', 'Unknown')}
         Video Channel: {video_info.get('channel', 'Unknown')}
         
         Transcript Sample:
-        {transcript_sample}
+        {_overview_transcript_sample(transcript)}
         
         Please provide a brief overview of this video content.
         """
@@ -84,31 +215,19 @@ class SummarizerAgent:
                 prompt=user_prompt,
                 system_prompt=system_prompt,
                 response_format="json",
-                temperature=0.3
+                response_schema=Overview,
+                temperature=0.0
             )
             
-            # Try to parse the JSON response
+            # The schema constrains the output, so the response can be validated directly
             try:
-                overview = json.loads(overview_text)
+                overview = Overview.model_validate_json(overview_text).model_dump()
+                _OVERVIEW_CACHE.set(cache_key, overview)
+                return dict(overview)
                 
-                # Ensure we have all expected fields
-                if "description" not in overview:
-                    overview["description"] = "Overview not available."
-                
-                if "primary_topic" not in overview:
-                    overview["primary_topic"] = "Topic not identified."
-                    
-                if "target_audience" not in overview:
-                    overview["target_audience"] = "Audience not identified."
-                    
-                if "content_type" not in overview:
-                    overview["content_type"] = "Content type not identified."
-                    
-                return overview
-                
-            except json.JSONDecodeError:
-                # If JSON parsing fails, create a structured error response
-                print(f"JSON parsing error for overview")
+            except ValidationError:
+                # If the response doesn't match the schema, create a structured error response
+                logger.warning("Overview response doesn't match the schema")
                 
                 return {
                     'description': "Unable to generate overview: Invalid response format.",
@@ -128,7 +247,7 @@ class SummarizerAgent:
                 'content_type': "Unknown"
             }
     
-    def generate_summary(self, transcript, video_info, summary_length="Moderate"):
+    def generate_summary(self, transcript, video_info, summary_length="Moderate", force_refresh=False):
         """
         Generate a summary of the video transcript.
         
@@ -136,6 +255,7 @@ class SummarizerAgent:
             transcript (str): Video transcript
             video_info (dict): Information about the video
             summary_length (str): Length of summary ('Concise', 'Moderate', 'Comprehensive')
+            force_refresh (bool): Skip the cache and regenerate the summary
             
         Returns:
             dict: Summary information including key points and summary text
@@ -161,115 +281,48 @@ class SummarizerAgent:
                 'topics': ["Error: Insufficient Content"]
             }
         
-        # Configure length settings based on preference
-        max_length_map = {
-            "Concise": 150,
-            "Moderate": 300,
-            "Comprehensive": 500
-        }
-        
-        num_key_points_map = {
-            "Concise": 3,
-            "Moderate": 5,
-            "Comprehensive": 8
-        }
-        
-        max_length = max_length_map.get(summary_length, 300)
-        num_key_points = num_key_points_map.get(summary_length, 5)
-        
-        # Create prompt for summary generation
-        system_prompt = f"""
-        You are an expert educational content summarizer. Your task is to create a clear, insightful summary 
-        of a video transcript. Focus on the main ideas and key takeaways.
-        
-        Create a summary with these components:
-        1. A summary text of approximately {max_length} words
-        2. {num_key_points} key points from the video
-        3. A list of main topics covered
-        
-        Format your response as a JSON object with the following structure:
-        {{
-            "summary_text": "Summary of the video...",
-            "key_points": ["Point 1", "Point 2", ...],
-            "topics": ["Topic 1", "Topic 2", ...]
-        }}
-        
-        The summary should be informative and capture the essence of the educational content.
-        """
-        
-        # Handle large transcripts by chunking
-        MAX_CHUNK_SIZE = 7500  # Reserve some space for the prompt
-        if len(transcript) > MAX_CHUNK_SIZE:
-            # Use the first chunk, which likely contains the most important information
-            transcript_chunk = transcript[:MAX_CHUNK_SIZE] + "\n[Note: This is a portion of the full transcript due to length constraints]"
-        else:
-            transcript_chunk = transcript
+        # A user who picked a larger model gets that model's summary; the smaller model
+        # only drafts for the default model (or when drafting is explicitly enabled)
+        model_name = self.adk_manager.get_model()
+        cheap_model_name = self.adk_manager.get_cheap_model()
+        use_draft = model_name == DEFAULT_MODEL or CHEAP_SUMMARY_DRAFTS
         
-        user_prompt = f"""
-        Video Title: {video_info.get('title', 'Unknown')}
-        Video Channel: {video_info.get('channel', 'Unknown')}
-        
-        Transcript:
-        {transcript_chunk}
-        
-        Please provide a {summary_length.lower()} summary of this video content.
-        """
+        # Summaries are cached under the model that actually produced them
+        cache_key = _summary_cache_key(model_name, transcript, video_info, summary_length)
+        draft_key = _summary_cache_key(cheap_model_name, transcript, video_info, summary_length) if use_draft else None
+        if not force_refresh:
+            for key in filter(None, (cache_key, draft_key)):
+                cached_summary = _SUMMARY_CACHE.get(key)
+                if cached_summary is not None:
+                    return copy.deepcopy(cached_summary)
         
         try:
-            # Use Google ADK API to generate summary
-            summary_text = self.adk_manager.generate_text(
-                prompt=user_prompt,
-                system_prompt=system_prompt,
-                response_format="json",
-                temperature=0.5
-            )
-            
-            # Try to parse the JSON response
-            try:
-                # Clean the response text - remove any markdown code block indicators
-                if "```" in summary_text:
-                    # Get the content between code fences if present
-                    parts = summary_text.split("```")
-                    if len(parts) >= 3:  # At least one full code block
-                        # Take the content within the first code block
-                        # This skips the first part (before ````json) and takes what's between the backticks
-                        summary_text = parts[1]
-                        # Remove language identifier if exists
-                        if summary_text.startswith("json"):
-                            summary_text = summary_text[4:].strip()
-                    else:
-                        # Handle case where there's only an opening code fence
-                        summary_text = parts[-1].strip()
-                
-                # Now parse the cleaned text
-                summary = json.loads(summary_text)
+            if use_draft:
+                # Draft the summary with the smaller, faster model first, parsing each
+                # section as it streams in
+                try:
+                    summary = Summary.model_validate(dict(self.generate_summary_stream(
+                        transcript, video_info, summary_length, model_name=cheap_model_name
+                    ))).model_dump()
+                except (TypeError, ValueError):
+                    # Not a usable summary object (ValidationError is a ValueError)
+                    summary = None
                 
-                # Ensure we have all expected fields
-                if "summary_text" not in summary:
-                    summary["summary_text"] = "Summary not available."
-                
-                if "key_points" not in summary or not summary["key_points"]:
-                    summary["key_points"] = ["Key points not available."]
-                    
-                if "topics" not in summary or not summary["topics"]:
-                    summary["topics"] = ["Topics not available."]
-                    
-                return summary
-                
-            except json.JSONDecodeError as json_err:
-                # If JSON parsing fails, create a structured error response
-                print(f"JSON parsing error: {str(json_err)}")
-                print(f"Raw text: {summary_text[:150]}...")
-                
-                return {
-                    'summary_text': "Unable to generate summary: Invalid response format.",
-                    'key_points': [
-                        "Error parsing AI response",
-                        f"JSON error: {str(json_err)}",
-                        f"Raw response: {summary_text[:100]}..."
-                    ],
-                    'topics': ["Error: Response Formatting Issue"]
-                }
+                if summary is not None and _summary_is_complete(summary, summary_length):
+                    _SUMMARY_CACHE.set(draft_key, summary)
+                    return copy.deepcopy(summary)
+            
+            # Use the selected model directly, or escalate if the draft is incomplete or too short
+            summary = Summary.model_validate(
+                dict(self.generate_summary_stream(transcript, video_info, summary_length))
+            ).model_dump()
+            _SUMMARY_CACHE.set(cache_key, summary)
+            return copy.deepcopy(summary)
+            
+        except ValidationError as e:
+            # The schema constrains the output, so this only happens if the stream broke off
+            logger.warning("Summary response doesn't match the schema: %s", e)
+            return copy.deepcopy(_INVALID_SUMMARY_RESPONSE)
             
         except Exception as e:
             # Provide a more detailed error message
@@ -286,30 +339,170 @@ class SummarizerAgent:
                 'topics': ["Error: " + error_type]
             }
             
-    def refine_summary(self, summary, feedback):
+    def generate_summary_stream(self, transcript, video_info, summary_length="Moderate", model_name=None):
+        """
+        Generate a summary, yielding each section as soon as it has been received.
+        
+        The JSON is parsed while the response is still streaming, so parsing
+        overlaps the network transfer and callers can show early sections
+        (e.g. the summary text) before the rest has arrived.
+        
+        Args:
+            transcript (str): Video transcript (already validated)
+            video_info (dict): Information about the video
+            summary_length (str): Length of summary ('Concise', 'Moderate', 'Comprehensive')
+            model_name (str, optional): Model to use instead of the current model setting
+            
+        Yields:
+            tuple: (section name, section value), e.g. ("key_points", [...])
+        """
+        chunks = self.adk_manager.generate_text_stream(
+            **_summary_request(transcript, video_info, summary_length, model_name)
+        )
+        yield from iter_json_elements(chunks)
+    
+    def generate_summaries_batch(self, items, max_workers=4):
+        """
+        Generate summaries for several videos (e.g. a playlist or course) at once.
+        
+        Summaries that are already cached are returned directly; the rest are
+        requested concurrently instead of one video after the other.
+        
+        Args:
+            items (list): (transcript, video_info, summary_length) tuples
+            max_workers (int, optional): Maximum number of concurrent requests
+            
+        Returns:
+            list: One summary dictionary per item, in item order
+        """
+        model_name = self.adk_manager.get_model()
+        results = [None] * len(items)
+        pending = []
+        for index, (transcript, video_info, summary_length) in enumerate(items):
+            if not transcript or not isinstance(transcript, str) or len(transcript.strip()) < 50:
+                # Invalid transcripts get generate_summary's error response without a model call
+                results[index] = self.generate_summary(transcript, video_info, summary_length)
+                continue
+            
+            cache_key = _summary_cache_key(model_name, transcript, video_info, summary_length)
+            cached_summary = _SUMMARY_CACHE.get(cache_key)
+            if cached_summary is not None:
+                results[index] = copy.deepcopy(cached_summary)
+            else:
+                pending.append((index, cache_key, _summary_request(transcript, video_info, summary_length)))
+        
+        if pending:
+            summary_texts = self.adk_manager.generate_texts(
+                [request for _, _, request in pending], max_workers=max_workers
+            )
+            for (index, cache_key, _), summary_text in zip(pending, summary_texts):
+                results[index] = _summary_from_response(summary_text, cache_key)
+        
+        return results
+    
+    def generate_overview_and_summary(self, transcript, video_info, summary_length="Moderate"):
+        """
+        Generate the overview and a summary of a video in a single model call.
+        
+        Both tasks read the same transcript, so sending it once saves a round trip
+        and the repeated prompt processing. The summary is cached, so a later
+        generate_summary call for the same video and length returns it immediately.
+        
+        Args:
+            transcript (str): Video transcript
+            video_info (dict): Information about the video
+            summary_length (str): Length of summary ('Concise', 'Moderate', 'Comprehensive')
+            
+        Returns:
+            tuple: (overview dict, summary dict), in the shapes returned by
+                generate_overview and generate_summary
+        """
+        # Invalid or very short transcripts get the individual methods' error responses
+        if not transcript or not isinstance(transcript, str) or len(transcript.strip()) < 50:
+            return (
+                self.generate_overview(transcript, video_info),
+                self.generate_summary(transcript, video_info, summary_length)
+            )
+        
+        model_name = self.adk_manager.get_model()
+        overview_key = _overview_cache_key(model_name, transcript, video_info)
+        summary_key = _summary_cache_key(model_name, transcript, video_info, summary_length)
+        cached_overview = _OVERVIEW_CACHE.get(overview_key)
+        cached_summary = _SUMMARY_CACHE.get(summary_key)
+        if cached_overview is not None and cached_summary is not None:
+            return dict(cached_overview), copy.deepcopy(cached_summary)
+        
+        system_prompt = (
+            "You will complete two tasks on the same video transcript.\n\n"
+            f"TASK 1: OVERVIEW\n{_OVERVIEW_SYSTEM_PROMPT}\n"
+            f"TASK 2: SUMMARY\n{_summary_system_prompt(summary_length)}"
+        )
+        
+        user_prompt = f"""
+        Video Title: {video_info.get('title', 'Unknown')}
+        Video Channel: {video_info.get('channel', 'Unknown')}
+        
+        Transcript:
+        {_summary_transcript_chunk(transcript)}
+        
+        Please provide a brief overview and a {summary_length.lower()} summary of this video content.
+        """
+        
+        try:
+            combined_text = self.adk_manager.generate_text(
+                prompt=user_prompt,
+                system_prompt=system_prompt,
+                response_format="json",
+                response_schema=OverviewAndSummary,
+                temperature=0.0
+            )
+            combined = OverviewAndSummary.model_validate_json(combined_text)
+        except ValidationError as e:
+            # Fall back to one call per task, run concurrently
+            logger.warning("Combined overview and summary failed, generating separately: %s", e)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                overview_future = executor.submit(self.generate_overview, transcript, video_info)
+                summary_future = executor.submit(self.generate_summary, transcript, video_info, summary_length)
+                return overview_future.result(), summary_future.result()
+        
+        overview = combined.overview.model_dump()
+        summary = combined.summary.model_dump()
+        _OVERVIEW_CACHE.set(overview_key, overview)
+        _SUMMARY_CACHE.set(summary_key, summary)
+        return dict(overview), copy.deepcopy(summary)
+            
+    def refine_summary(self, summary, feedback, force_refresh=False):
         """
         Refine the summary based on user feedback.
         
         Args:
             summary (dict): Existing summary
             feedback (str): User feedback
+            force_refresh (bool): Skip the cache and refine the summary again
             
         Returns:
             dict: Refined summary
         """
+        # Nothing to refine with, so don't spend a model call
+        if not feedback or not feedback.strip():
+            return summary
+        
+        # The same feedback on the same summary gives the same refinement
+        cache_key = LLMCache.make_key(
+            self.adk_manager.get_model(), SCHEMA_VERSION, summary.get('summary_text'),
+            summary.get('key_points'), summary.get('topics'), feedback
+        )
+        if not force_refresh:
+            cached_summary = _REFINE_CACHE.get(cache_key)
+            if cached_summary is not None:
+                return copy.deepcopy(cached_summary)
+        
+        key_points = ', '.join(summary.get('key_points') or ['No key points available.'])
+        topics = ', '.join(summary.get('topics') or ['No topics available.'])
+        
         try:
             # System prompt for refining summary
-            system_prompt = """
-            You are an expert educational content summarizer. Your task is to refine an existing summary
-            based on user feedback. Incorporate the feedback while maintaining clarity and conciseness.
-            
-            Format your response as a JSON object with the following structure:
-            {
-                "summary_text": "Refined summary of the video...",
-                "key_points": ["Refined Point 1", "Refined Point 2", ...],
-                "topics": ["Topic 1", "Topic 2", ...]
-            }
-            """
+            system_prompt = _REFINE_SYSTEM_PROMPT
             
             # Create prompt for summary refinement
             user_prompt = f"""
@@ -317,10 +510,10 @@ class SummarizerAgent:
             {summary.get('summary_text', 'No summary available.')}
             
             Original Key Points:
-            {', '.join(summary.get('key_points', ['No key points available.']))}
+            {key_points}
             
             Original Topics:
-            {', '.join(summary.get('topics', ['No topics available.']))}
+            {topics}
             
             User Feedback:
             {feedback}
@@ -333,30 +526,21 @@ class SummarizerAgent:
                 prompt=user_prompt,
                 system_prompt=system_prompt,
                 response_format="json",
-                temperature=0.5
+                response_schema=Summary,
+                temperature=0.2
             )
             
-            # Try to parse the JSON response
+            # The schema constrains the output, so the response can be validated directly
             try:
-                refined_summary = json.loads(refined_summary_text)
-                
-                # Ensure we have all expected fields
-                if "summary_text" not in refined_summary:
-                    refined_summary["summary_text"] = summary.get("summary_text", "Summary not available.")
-                
-                if "key_points" not in refined_summary or not refined_summary["key_points"]:
-                    refined_summary["key_points"] = summary.get("key_points", ["Key points not available."])
-                    
-                if "topics" not in refined_summary or not refined_summary["topics"]:
-                    refined_summary["topics"] = summary.get("topics", ["Topics not available."])
-                    
-                return refined_summary
+                refined_summary = Summary.model_validate_json(refined_summary_text).model_dump()
+                _REFINE_CACHE.set(cache_key, refined_summary)
+                return copy.deepcopy(refined_summary)
                 
-            except json.JSONDecodeError:
-                print(f"Error parsing refined summary JSON: {refined_summary_text[:100]}...")
+            except ValidationError:
+                logger.warning("Refined summary doesn't match the schema: %.100s...", refined_summary_text)
                 return summary
             
         except Exception as e:
             # Return original summary if refinement fails
-            print(f"Error refining summary: {str(e)}")
+            logger.warning("Error refining summary: %s", e)
             return summary
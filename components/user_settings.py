@@ -1,8 +1,241 @@
 import streamlit as st
-import json
 import os
-from pathlib import Path
-import shutil
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from utils.json_utils import dumps_bytes, loads, read_json, write_bytes_atomic
+from utils.user_paths import ensure_dir, sanitize_email, user_settings_path
+
+try:
+    # Optional binary copy of the settings files, faster to parse than JSON
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: also keep each user's settings as MessagePack (settings_file.msgpack) and read that copy
+USE_MSGPACK = msgpack is not None and os.getenv("USER_SETTINGS_MSGPACK", "").lower() in ("1", "true", "yes")
+
+# Resolved once here rather than imported inside the methods called on every rerun
+try:
+    from utils.session_state import get_iap_email
+except ImportError:
+    def get_iap_email():
+        return None
+
+try:
+    from utils.reset_manager import ResetManager
+except ImportError:
+    ResetManager = None  # Methods fall back to checking the reset marker files directly
+
+# Learning preference keys and factories for the value used when one is missing or null
+_LP_DEFAULTS = {
+    'learning_interests': list,
+    'learning_goals': str,
+    'preferred_learning_style': lambda: 'Visual',
+    'skill_level': lambda: 'Beginner',
+    'learning_recommendations': dict,
+    'completed_milestones': list,
+    'user_progress': int,
+    'learning_path': dict
+}
+_LP_KEYS = tuple(_LP_DEFAULTS)
+_LP_KEYS_SET = frozenset(_LP_KEYS)
+
+# Maximum number of users whose parsed settings are kept in memory
+_SETTINGS_CACHE_SIZE = 128
+
+# email -> (file read, its mtime in ns, parsed settings), least recently used first
+_SETTINGS_CACHE = OrderedDict()
+_SETTINGS_CACHE_LOCK = threading.Lock()
+
+# Seconds a user's reset status is trusted before the marker file is checked again
+_RESET_CACHE_TTL = 5.0
+
+# email -> (time.monotonic() when checked, whether the user was reset)
+_RESET_CACHE = {}
+
+# Users whose is_iap_authenticated flag was set on load but not yet written to their file
+_PENDING_IAP_FLAG = set()
+
+# Font size settings
+_FONT_SIZE_VALUES = {
+    'Small': '0.9rem',
+    'Medium': '1rem',
+    'Large': '1.2rem'
+}
+
+# Color scheme settings
+_COLOR_SCHEMES = {
+    'Default': {
+        'bg_color': '#FFFFFF',
+        'text_color': '#31333F',
+        'accent_color': '#1E3A8A'
+    },
+    'High Contrast': {
+        'bg_color': '#FFFFFF',
+        'text_color': '#000000',
+        'accent_color': '#0000CC'
+    },
+    'Dark Mode': {
+        'bg_color': '#1E1E1E',
+        'text_color': '#E0E0E0',
+        'accent_color': '#4D8BF5'
+    }
+}
+
+# file path -> (digest of the last bytes written, file mtime in ns after the write)
+_LAST_WRITE = {}
+
+
+def _msgpack_path(file_path):
+    """
+    Get the path of the MessagePack copy of a settings file.
+    
+    Args:
+        file_path (str): User's JSON settings file
+        
+    Returns:
+        str: Path of the binary copy
+    """
+    return os.path.splitext(file_path)[0] + ".msgpack"
+
+
+def _read_user_settings(email, file_path):
+    """
+    Read a user's settings file, reusing the parsed copy while the file is unchanged.
+    
+    Settings are loaded on every Streamlit rerun, and the file rarely changes
+    between them, so the disk read and JSON parse are skipped when the file's
+    modification time matches the cached one. With USE_MSGPACK, the binary copy
+    is read instead of the JSON file as long as it is not older than the JSON.
+    
+    Args:
+        email (str): User email address
+        file_path (str): User's settings file
+        
+    Returns:
+        dict: User settings (a copy the caller may modify)
+    """
+    source = file_path
+    mtime = os.stat(file_path).st_mtime_ns
+    if USE_MSGPACK:
+        try:
+            binary_mtime = os.stat(_msgpack_path(file_path)).st_mtime_ns
+            if binary_mtime >= mtime:
+                source, mtime = _msgpack_path(file_path), binary_mtime
+        except FileNotFoundError:
+            pass  # Created by the next write
+    
+    with _SETTINGS_CACHE_LOCK:
+        entry = _SETTINGS_CACHE.get(email)
+        if entry is not None and entry[0] == source and entry[1] == mtime:
+            _SETTINGS_CACHE.move_to_end(email)
+            return copy.deepcopy(entry[2])
+    
+    if source == file_path:
+        settings = read_json(file_path)
+    else:
+        with open(source, 'rb') as f:
+            settings = msgpack.unpackb(f.read(), raw=False)
+    with _SETTINGS_CACHE_LOCK:
+        _SETTINGS_CACHE[email] = (source, mtime, settings)
+        _SETTINGS_CACHE.move_to_end(email)
+        while len(_SETTINGS_CACHE) > _SETTINGS_CACHE_SIZE:
+            _SETTINGS_CACHE.popitem(last=False)
+    return copy.deepcopy(settings)
+
+
+def _invalidate_user_settings(email):
+    """
+    Drop a user's cached settings after their file was written or deleted.
+    
+    Args:
+        email (str): User email address
+    """
+    with _SETTINGS_CACHE_LOCK:
+        _SETTINGS_CACHE.pop(email, None)
+
+
+def _write_user_settings(email, file_path, settings):
+    """
+    Write a user's settings file, skipping the write if the contents are unchanged.
+    
+    Settings are saved on many reruns where nothing changed; the serialized bytes
+    are compared by digest with the last write, which is trusted only while the
+    file still has the modification time that write gave it.
+    
+    Args:
+        email (str): User email address
+        file_path (str): User's settings file
+        settings (dict): Settings to save
+        
+    Returns:
+        bool: True if the file was written, False if it already had these contents
+    """
+    # Flush an IAP flag deferred by load_settings_by_email
+    if email in _PENDING_IAP_FLAG:
+        settings['is_iap_authenticated'] = True
+    
+    data = dumps_bytes(settings, indent=True)
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+    
+    last = _LAST_WRITE.get(file_path)
+    if last is not None and last[0] == digest:
+        try:
+            if os.stat(file_path).st_mtime_ns == last[1]:
+                return False
+        except OSError:
+            pass
+    
+    # The JSON file stays current as the portable copy; the binary copy is written
+    # after it so its newer mtime marks it as up to date
+    write_bytes_atomic(file_path, data)
+    if USE_MSGPACK:
+        # Packed from the JSON round trip so both copies read back identically (e.g. string keys)
+        write_bytes_atomic(_msgpack_path(file_path), msgpack.packb(loads(data), use_bin_type=True))
+    _invalidate_user_settings(email)
+    _PENDING_IAP_FLAG.discard(email)
+    _LAST_WRITE[file_path] = (digest, os.stat(file_path).st_mtime_ns)
+    return True
+
+
+@lru_cache(maxsize=16)
+def _settings_css(font_size, color_scheme):
+    """
+    Build the CSS for a font size and color scheme (there are only a handful of combinations).
+    
+    Args:
+        font_size (str): Font size setting
+        color_scheme (str): Color scheme setting
+        
+    Returns:
+        str: Style block to render with st.markdown
+    """
+    font_size_value = _FONT_SIZE_VALUES.get(font_size, '1rem')
+    scheme = _COLOR_SCHEMES.get(color_scheme, _COLOR_SCHEMES['Default'])
+    
+    return f"""
+        <style>
+            .main-container {{
+                font-size: {font_size_value};
+                color: {scheme['text_color']};
+            }}
+            
+            .main-header {{
+                color: {scheme['accent_color']};
+            }}
+            
+            .section-header {{
+                color: {scheme['accent_color']};
+            }}
+        </style>
+        """
 
 class UserSettings:
     def __init__(self, settings_file=None):
@@ -14,16 +247,27 @@ class UserSettings:
         """
         # Create a data directory if it doesn't exist
         self.data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
-        Path(self.data_dir).mkdir(exist_ok=True)
+        ensure_dir(self.data_dir)
         
         if settings_file:
             self.settings_file = settings_file
         else:
             self.settings_file = os.path.join(self.data_dir, "user_settings.json")
         
-        print(f"UserSettings initialized with settings_file: {self.settings_file}")
+        logger.debug("UserSettings initialized with settings_file: %s", self.settings_file)
+    
+    @classmethod
+    def fresh_defaults(cls):
+        """
+        Build a new copy of the default settings.
         
-        self.default_settings = {
+        Every call returns new lists and dicts, so a caller modifying the result
+        never changes the defaults seen by other users.
+        
+        Returns:
+            dict: Default user settings
+        """
+        return {
             'user_email': '',  # Primary user identifier
             'user_name': '',   # Optional display name
             'font_size': 'Medium',
@@ -39,6 +283,30 @@ class UserSettings:
             'completed_milestones': [],
             'user_progress': 0
         }
+    
+    def _user_path(self, email):
+        """
+        Get the settings file path for a user.
+        
+        Args:
+            email (str): User email address
+            
+        Returns:
+            str: Path of the user's settings file
+        """
+        return user_settings_path(self.data_dir, email)
+    
+    def _reset_marker_path(self, email):
+        """
+        Get the path of the marker file recording that a user was reset.
+        
+        Args:
+            email (str): User email address
+            
+        Returns:
+            str: Path of the user's reset marker
+        """
+        return os.path.join(self.data_dir, "reset_users", f"{sanitize_email(email)}.reset")
         
     def load_settings(self):
         """
@@ -48,13 +316,12 @@ class UserSettings:
             dict: User settings
         """
         try:
-            if Path(self.settings_file).exists():
-                with open(self.settings_file, 'r') as f:
-                    return json.load(f)
-            else:
-                return self.default_settings
-        except Exception:
-            return self.default_settings
+            return read_json(self.settings_file)
+        except FileNotFoundError:
+            return self.fresh_defaults()
+        except (OSError, ValueError):
+            logger.exception("Error loading settings from %s", self.settings_file)
+            return self.fresh_defaults()
     
     def save_settings(self, settings):
         """
@@ -64,86 +331,43 @@ class UserSettings:
             settings (dict): User settings to save
         """
         try:
-            # Update session state with settings
-            for key, value in settings.items():
-                st.session_state[key] = value
-            
-            # Preserve learning preferences in the settings if they exist in session state
-            learning_preference_keys = [
-                'learning_interests', 'learning_goals', 'preferred_learning_style', 
-                'skill_level', 'learning_recommendations', 'completed_milestones', 
-                'user_progress', 'learning_path'
-            ]
-            
-            # Always include all learning preference keys that exist in session state
-            for key in learning_preference_keys:
-                if key in st.session_state:
+            # Preserve learning preferences in the settings if they exist in session state,
+            # always including all learning preference keys that exist in session state
+            # (values passed in take precedence)
+            for key in _LP_KEYS:
+                if key in settings or key in st.session_state:
+                    value = settings[key] if key in settings else st.session_state[key]
                     # Handle null values - convert to appropriate empty defaults
-                    if st.session_state[key] is None:
-                        if key == 'learning_interests' or key == 'completed_milestones':
-                            settings[key] = []
-                        elif key == 'learning_goals':
-                            settings[key] = ''
-                        elif key in ['learning_path', 'learning_recommendations']:
-                            settings[key] = {}
-                        elif key == 'user_progress':
-                            settings[key] = 0
-                    else:
-                        settings[key] = st.session_state[key]
-                    print(f"Saved {key} from session state to settings")
-            
-            # Ensure learning_path and learning_recommendations are always synchronized
-            # and both are included in the settings, never as null values
-            if 'learning_recommendations' in settings:
-                # Handle null values
-                if settings['learning_recommendations'] is None:
-                    settings['learning_recommendations'] = {}
-                    
-                settings['learning_path'] = settings['learning_recommendations']
-                st.session_state['learning_path'] = settings['learning_recommendations']
-                st.session_state['learning_recommendations'] = settings['learning_recommendations'] 
-                print("Synchronized learning_path from learning_recommendations in settings")
-            elif 'learning_path' in settings:
-                # Handle null values
-                if settings['learning_path'] is None:
-                    settings['learning_path'] = {}
-                    
-                settings['learning_recommendations'] = settings['learning_path']
-                st.session_state['learning_recommendations'] = settings['learning_path']
-                st.session_state['learning_path'] = settings['learning_path']
-                print("Synchronized learning_recommendations from learning_path in settings")
-            else:
-                # Neither exists, initialize both as empty objects
-                settings['learning_path'] = {}
-                settings['learning_recommendations'] = {}
-                st.session_state['learning_path'] = {}
-                st.session_state['learning_recommendations'] = {}
-                print("Initialized both learning_path and learning_recommendations as empty objects")
+                    settings[key] = _LP_DEFAULTS[key]() if value is None else value
+                    logger.debug("Saved %s from session state to settings", key)
+            
+            # Keep learning_path and learning_recommendations synchronized, never as null values
+            learning_path = settings.get('learning_recommendations') or settings.get('learning_path') or {}
+            settings['learning_path'] = settings['learning_recommendations'] = learning_path
+            
+            # Update session state with all settings in one call
+            st.session_state.update(settings)
             
             # If email is provided, use it to create a user-specific file
             email = settings.get('user_email', '')
             if email:
                 # Create a filename based on email (sanitized to be file-system friendly)
-                file_name = os.path.join(self.data_dir, f"user_settings_{email.replace('@', '_at_').replace('.', '_dot_')}.json")
-                
-                # Ensure the directory exists
-                os.makedirs(os.path.dirname(file_name), exist_ok=True)
+                file_name = self._user_path(email)
                 
                 # Save to user-specific file for persistence between sessions
-                with open(file_name, 'w') as f:
-                    json.dump(settings, f, indent=4)
+                _write_user_settings(email, file_name, settings)
                     
-                print(f"Settings saved for user: {email} at path: {file_name}")
+                logger.debug("Settings saved for user: %s at path: %s", email, file_name)
                 
                 # Make sure this becomes the active settings file for subsequent loads
                 self.settings_file = file_name
                 return True
             else:
                 # If no email is provided, reject the save
-                print("Cannot save settings: no email provided")
+                logger.warning("Cannot save settings: no email provided")
                 return False
-        except Exception as e:
-            print(f"Error saving settings: {str(e)}")
+        except Exception:
+            logger.exception("Error saving settings")
             return False
     
     def get_setting(self, key, default=None):
@@ -176,151 +400,101 @@ class UserSettings:
         try:
             # If email is empty, return default settings
             if not email:
-                return self.default_settings
+                return self.fresh_defaults()
             
             # Check if this user was previously reset
             was_reset = self.check_if_user_reset(email)
             
             # Check if this is an IAP authenticated email
-            from utils.session_state import get_iap_email
             iap_email = get_iap_email()
             is_iap_auth = (iap_email and iap_email == email)
             
             # Generate sanitized filename
-            user_settings_file = os.path.join(self.data_dir, f"user_settings_{email.replace('@', '_at_').replace('.', '_dot_')}.json")
+            user_settings_file = self._user_path(email)
+            
+            # Load the user's file unless they were reset (a missing file means no saved settings)
+            stored_settings = None
+            if not was_reset:
+                try:
+                    stored_settings = _read_user_settings(email, user_settings_file)
+                except FileNotFoundError:
+                    pass
             
             # Prepare settings based on reset status and file existence
-            if was_reset or not Path(user_settings_file).exists():
+            if stored_settings is None:
                 # Either user was reset or no settings file exists
                 if was_reset:
-                    print(f"User {email} was previously reset. Starting with fresh settings.")
+                    logger.debug("User %s was previously reset. Starting with fresh settings.", email)
                     # Clear reset marker to prevent constant reset
                     try:
-                        sanitized_email = email.replace('@', '_at_').replace('.', '_dot_')
-                        reset_marker = os.path.join(self.data_dir, "reset_users", f"{sanitized_email}.reset")
-                        if os.path.exists(reset_marker):
-                            os.remove(reset_marker)
-                            print(f"Cleared reset marker for {email}")
-                    except Exception as e:
-                        print(f"Error clearing reset marker: {str(e)}")
+                        if ResetManager is not None:
+                            cleared = ResetManager().clear_reset(email)
+                        else:
+                            try:
+                                os.remove(self._reset_marker_path(email))
+                                cleared = True
+                            except FileNotFoundError:
+                                cleared = False
+                        if cleared:
+                            logger.debug("Cleared reset marker for %s", email)
+                        _RESET_CACHE[email] = (time.monotonic(), False)
+                    except Exception:
+                        logger.exception("Error clearing reset marker")
                 else:
-                    print(f"No settings file found for {email}, using default settings")
+                    logger.debug("No settings file found for %s, using default settings", email)
                 
                 # Use default settings
-                settings = self.default_settings.copy()
+                settings = self.fresh_defaults()
                 settings['user_email'] = email
                 if is_iap_auth:
                     settings['is_iap_authenticated'] = True
             else:
-                # File exists and user wasn't reset - load from file
-                print(f"Loading settings from: {user_settings_file}")
-                with open(user_settings_file, 'r') as f:
-                    settings = json.load(f)
+                # File exists and user wasn't reset - use the loaded settings
+                logger.debug("Loaded settings from: %s", user_settings_file)
+                settings = stored_settings
                 
-                # If this is an IAP authenticated email, mark it in the settings
+                # If this is an IAP authenticated email, mark it in the settings; the
+                # file is updated with this by the next save rather than rewritten now
                 if is_iap_auth and not settings.get('is_iap_authenticated'):
                     settings['is_iap_authenticated'] = True
-                    # Update the file with this information
-                    with open(user_settings_file, 'w') as f:
-                        json.dump(settings, f, indent=4)
-                
-                # Define learning preference keys to load into session state
-                learning_preference_keys = [
-                    'learning_interests', 'learning_goals', 'preferred_learning_style', 
-                    'skill_level', 'learning_recommendations', 'completed_milestones', 
-                    'user_progress', 'learning_path'
-                ]
-                
-                # Load all available learning preferences into session state
-                for key in learning_preference_keys:
-                    if key in settings:  # If the key exists in settings
-                        # Handle null values appropriately
-                        if settings[key] is None:
-                            # Initialize with default value if null
-                            if key == 'learning_interests':
-                                st.session_state[key] = []
-                            elif key == 'learning_goals':
-                                st.session_state[key] = ''
-                            elif key == 'preferred_learning_style':
-                                st.session_state[key] = 'Visual'
-                            elif key == 'skill_level':
-                                st.session_state[key] = 'Beginner'
-                            elif key in ['learning_path', 'learning_recommendations']:
-                                st.session_state[key] = {}
-                            elif key == 'completed_milestones':
-                                st.session_state[key] = []
-                            elif key == 'user_progress':
-                                st.session_state[key] = 0
-                            print(f"Initialized default value for {key} (was null in settings)")
-                        else:
-                                        # Always use the value from settings, overwriting any existing session state value
-                            st.session_state[key] = settings[key]
-                            
-                            # For empty arrays/lists, ensure they're treated as valid values
-                            if key == 'learning_interests' and isinstance(st.session_state[key], list) and not st.session_state[key]:
-                                print(f"Loaded empty {key} from user settings (treated as valid)")
-                            else:
-                                print(f"Loaded {key} from user settings")
-                    else:
-                        # Key is missing in settings
-                        # Only initialize if not already in session state
-                        if key not in st.session_state or st.session_state.get(key) is None:
-                            if key == 'learning_interests':
-                                st.session_state[key] = []
-                            elif key == 'learning_goals':
-                                st.session_state[key] = ''
-                            elif key == 'preferred_learning_style':
-                                st.session_state[key] = 'Visual'
-                            elif key == 'skill_level':
-                                st.session_state[key] = 'Beginner'
-                            elif key in ['learning_path', 'learning_recommendations']:
-                                st.session_state[key] = {}
-                            elif key == 'completed_milestones':
-                                st.session_state[key] = []
-                            elif key == 'user_progress':
-                                st.session_state[key] = 0
-                            print(f"Initialized default value for {key} (missing in settings)")
-                
-                # Ensure consistency between learning_recommendations and learning_path
-                # Handle various cases including null values
-                if 'learning_path' in settings and settings['learning_path'] and isinstance(settings['learning_path'], dict):
-                    # Valid learning_path exists
-                    st.session_state['learning_path'] = settings['learning_path']
-                    st.session_state['learning_recommendations'] = settings['learning_path']
-                    print("Synced learning_path and learning_recommendations from settings (using learning_path)")
+                    _PENDING_IAP_FLAG.add(email)
                 
-                elif 'learning_recommendations' in settings and settings['learning_recommendations'] and isinstance(settings['learning_recommendations'], dict):
-                    # Valid learning_recommendations exists
-                    st.session_state['learning_path'] = settings['learning_recommendations']
-                    st.session_state['learning_recommendations'] = settings['learning_recommendations']
-                    print("Synced learning_path and learning_recommendations from settings (using learning_recommendations)")
+                # Resolve every learning preference to load into session state in one pass
+                resolved = {}
+                for key in _LP_KEYS:
+                    value = settings.get(key)
+                    if value is not None:
+                        # Always use the value from settings, overwriting any existing session state value
+                        # (empty lists and strings are valid values)
+                        resolved[key] = value
+                    elif key in settings or st.session_state.get(key) is None:
+                        # Null in settings, or missing from both settings and session state
+                        resolved[key] = _LP_DEFAULTS[key]()
                 
-                else:
-                    # Neither exists with a valid non-empty value, initialize both
-                    st.session_state['learning_path'] = {}
-                    st.session_state['learning_recommendations'] = {}
-                    settings['learning_path'] = {}
-                    settings['learning_recommendations'] = {}
-                    print("Initialized both learning_path and learning_recommendations as empty objects")
+                # learning_path and learning_recommendations hold the same value: the first
+                # non-empty dict of the two, otherwise both are initialized as empty objects
+                learning_path = settings.get('learning_path')
+                if not (learning_path and isinstance(learning_path, dict)):
+                    learning_path = settings.get('learning_recommendations')
+                    if not (learning_path and isinstance(learning_path, dict)):
+                        learning_path = settings['learning_path'] = settings['learning_recommendations'] = {}
+                resolved['learning_path'] = resolved['learning_recommendations'] = learning_path
+                logger.debug("Loaded learning preferences for %s: %s", email, list(resolved))
                 
                 # Update the settings file to be the user-specific one for future operations
                 self.settings_file = user_settings_file
                 
-                # Load all settings into session state for immediate use
-                for key, value in settings.items():
-                    # Don't overwrite learning preferences that have already been set
-                    learning_preference_keys = [
-                        'learning_interests', 'learning_goals', 'preferred_learning_style', 
-                        'skill_level', 'learning_recommendations', 'completed_milestones', 
-                        'user_progress', 'learning_path'
-                    ]
-                    if key not in st.session_state or key not in learning_preference_keys:
-                        st.session_state[key] = value
+                # Load all other settings into session state for immediate use, together
+                # with the learning preferences above, in a single update
+                resolved.update(
+                    (key, value) for key, value in settings.items() if key not in _LP_KEYS_SET
+                )
+                st.session_state.update(resolved)
                 
                 return settings
             
             # If no user-specific file exists, return default settings with the email populated
-            settings = self.default_settings.copy()
+            settings = self.fresh_defaults()
             settings['user_email'] = email
             
             # If this is an IAP authenticated email, mark it
@@ -328,9 +502,9 @@ class UserSettings:
                 settings['is_iap_authenticated'] = True
             
             return settings
-        except Exception as e:
-            print(f"Error loading settings for {email}: {str(e)}")
-            return self.default_settings
+        except Exception:
+            logger.exception("Error loading settings for %s", email)
+            return self.fresh_defaults()
     
     def apply_settings_to_ui(self):
         """
@@ -340,53 +514,8 @@ class UserSettings:
         font_size = self.get_setting('font_size', 'Medium')
         color_scheme = self.get_setting('color_scheme', 'Default')
         
-        # Font size settings
-        font_size_values = {
-            'Small': '0.9rem',
-            'Medium': '1rem',
-            'Large': '1.2rem'
-        }
-        
-        font_size_value = font_size_values.get(font_size, '1rem')
-        
-        # Color scheme settings
-        color_schemes = {
-            'Default': {
-                'bg_color': '#FFFFFF',
-                'text_color': '#31333F',
-                'accent_color': '#1E3A8A'
-            },
-            'High Contrast': {
-                'bg_color': '#FFFFFF',
-                'text_color': '#000000',
-                'accent_color': '#0000CC'
-            },
-            'Dark Mode': {
-                'bg_color': '#1E1E1E',
-                'text_color': '#E0E0E0',
-                'accent_color': '#4D8BF5'
-            }
-        }
-        
-        scheme = color_schemes.get(color_scheme, color_schemes['Default'])
-        
         # Apply CSS with the settings
-        css = f"""
-        <style>
-            .main-container {{
-                font-size: {font_size_value};
-                color: {scheme['text_color']};
-            }}
-            
-            .main-header {{
-                color: {scheme['accent_color']};
-            }}
-            
-            .section-header {{
-                color: {scheme['accent_color']};
-            }}
-        </style>
-        """
+        css = _settings_css(font_size, color_scheme)
         
         st.markdown(css, unsafe_allow_html=True)
     
@@ -402,39 +531,32 @@ class UserSettings:
         """
         try:
             if not email:
-                print("Cannot save learning preferences: no email provided")
+                logger.warning("Cannot save learning preferences: no email provided")
                 return False
                 
             # Generate sanitized filename
-            user_settings_file = os.path.join(self.data_dir, f"user_settings_{email.replace('@', '_at_').replace('.', '_dot_')}.json")
-            print(f"Looking for user settings file at: {user_settings_file}")
+            user_settings_file = self._user_path(email)
+            logger.debug("Looking for user settings file at: %s", user_settings_file)
             
             # Load existing settings or create new ones
-            if Path(user_settings_file).exists():
-                with open(user_settings_file, 'r') as f:
-                    settings = json.load(f)
-                print(f"Loaded existing settings for {email}")
-            else:
-                settings = self.default_settings.copy()
+            try:
+                settings = _read_user_settings(email, user_settings_file)
+                logger.debug("Loaded existing settings for %s", email)
+            except FileNotFoundError:
+                settings = self.fresh_defaults()
                 settings['user_email'] = email
-                print(f"Created new settings for {email}")
-            
-            # Update settings with current learning preferences from session state
-            learning_preference_keys = [
-                'learning_interests', 'learning_goals', 'preferred_learning_style', 
-                'skill_level', 'learning_recommendations', 'completed_milestones', 
-                'user_progress', 'learning_path'
-            ]
+                logger.debug("Created new settings for %s", email)
             
+            # Update settings with current learning preferences from session state.
             # First ensure that all learning preference keys exist in session state
             # by transferring existing values from settings if they don't exist in session state
-            for key in learning_preference_keys:
+            for key in _LP_KEYS:
                 if key in settings and settings[key] and key not in st.session_state:
                     st.session_state[key] = settings[key]
-                    print(f"Restored {key} from settings to session state")
+                    logger.debug("Restored %s from settings to session state", key)
             
             # Now update settings with the current session state values
-            for key in learning_preference_keys:
+            for key in _LP_KEYS:
                 if key in st.session_state:
                     # Check if the value has changed before updating
                     has_changed = False
@@ -445,56 +567,34 @@ class UserSettings:
                         
                     # Ensure we don't save null values but convert them to empty defaults
                     if st.session_state[key] is None:
-                        if key == 'learning_interests' or key == 'completed_milestones':
-                            settings[key] = []
-                        elif key == 'learning_goals':
-                            settings[key] = ''
-                        elif key in ['learning_path', 'learning_recommendations']:
-                            settings[key] = {}
-                        elif key == 'user_progress':
-                            settings[key] = 0
+                        settings[key] = _LP_DEFAULTS[key]()
                         if has_changed:
-                            print(f"Updated {key} in settings from session state (null converted to default)")
+                            logger.debug("Updated %s in settings from session state (null converted to default)", key)
                     else:
                         settings[key] = st.session_state[key]
                         if has_changed:
-                            print(f"Updated {key} in settings from session state")
-            
-            # Ensure both learning_path and learning_recommendations are saved for consistency
-            # and make sure they are never null/None but at least empty objects
-            if 'learning_recommendations' in st.session_state:
-                if st.session_state['learning_recommendations'] is None:
-                    st.session_state['learning_recommendations'] = {}
-                settings['learning_recommendations'] = st.session_state['learning_recommendations']
-                settings['learning_path'] = st.session_state['learning_recommendations']
-                st.session_state['learning_path'] = st.session_state['learning_recommendations']
-                print("Synchronized learning_path from learning_recommendations")
-            elif 'learning_path' in st.session_state:
-                if st.session_state['learning_path'] is None:
-                    st.session_state['learning_path'] = {}
-                settings['learning_path'] = st.session_state['learning_path']
-                settings['learning_recommendations'] = st.session_state['learning_path']
-                st.session_state['learning_recommendations'] = st.session_state['learning_path']
-                print("Synchronized learning_recommendations from learning_path")
+                            logger.debug("Updated %s in settings from session state", key)
+            
+            # Save both learning_path and learning_recommendations for consistency (the
+            # session state values were copied into settings above), never as null values
+            learning_path = settings.get('learning_recommendations') or settings.get('learning_path') or {}
+            settings['learning_path'] = settings['learning_recommendations'] = learning_path
+            st.session_state['learning_path'] = st.session_state['learning_recommendations'] = learning_path
             
             # Ensure the user_email is correctly set
             settings['user_email'] = email
             
-            # Ensure the directory exists
-            os.makedirs(os.path.dirname(user_settings_file), exist_ok=True)
-            
             # Save to user-specific file
-            with open(user_settings_file, 'w') as f:
-                json.dump(settings, f, indent=4)
+            _write_user_settings(email, user_settings_file, settings)
             
             # Update the settings file reference for future operations
             self.settings_file = user_settings_file
                 
-            print(f"Learning preferences saved for user: {email} at path: {user_settings_file}")
+            logger.debug("Learning preferences saved for user: %s at path: %s", email, user_settings_file)
             return True
             
-        except Exception as e:
-            print(f"Error saving learning preferences: {str(e)}")
+        except Exception:
+            logger.exception("Error saving learning preferences")
             return False
     
     def delete_user_settings(self, email):
@@ -508,53 +608,57 @@ class UserSettings:
             bool: True if successful, False otherwise
         """
         if not email:
-            print("Cannot delete settings: no email provided")
+            logger.warning("Cannot delete settings: no email provided")
             return False
             
         try:
             # Generate sanitized filename
-            sanitized_email = email.replace('@', '_at_').replace('.', '_dot_')
-            user_settings_file = os.path.join(self.data_dir, f"user_settings_{sanitized_email}.json")
+            user_settings_file = self._user_path(email)
             
-            print(f"Attempting to delete user settings at: {user_settings_file}")
+            logger.debug("Attempting to delete user settings at: %s", user_settings_file)
             
-            if not Path(user_settings_file).exists():
-                print(f"No settings file found for {email}")
-                return True  # Consider it a success if the file doesn't exist
-                
-            # Create backup before deletion
+            # Move the file aside as a backup; a rename only touches metadata,
+            # so this is the deletion itself rather than a copy followed by a delete
             backup_file = f"{user_settings_file}.bak"
-            shutil.copy2(user_settings_file, backup_file)
-            print(f"Created backup at: {backup_file}")
-            
-            # Delete the file
-            os.remove(user_settings_file)
+            try:
+                os.replace(user_settings_file, backup_file)
+            except FileNotFoundError:
+                logger.debug("No settings file found for %s", email)
+                return True  # Consider it a success if the file doesn't exist
+            logger.debug("Moved settings to backup at: %s", backup_file)
+            
+            _invalidate_user_settings(email)
+            _LAST_WRITE.pop(user_settings_file, None)
+            try:
+                os.remove(_msgpack_path(user_settings_file))
+            except FileNotFoundError:
+                pass
+            _PENDING_IAP_FLAG.discard(email)
             deleted = not os.path.exists(user_settings_file)
             
             if deleted:
                 # Use the ResetManager to record the reset
                 try:
-                    from utils.reset_manager import ResetManager
                     reset_manager = ResetManager()
                     reset_manager.record_reset(email)
-                    print(f"Recorded reset for user: {email}")
-                except Exception as e:
+                    logger.debug("Recorded reset for user: %s", email)
+                except Exception:
                     # Fallback to direct file creation if ResetManager fails
-                    reset_marker_dir = os.path.join(self.data_dir, "reset_users")
-                    os.makedirs(reset_marker_dir, exist_ok=True)
-                    reset_marker = os.path.join(reset_marker_dir, f"{sanitized_email}.reset")
+                    reset_marker = self._reset_marker_path(email)
+                    ensure_dir(os.path.dirname(reset_marker))
                     with open(reset_marker, 'w') as f:
                         f.write(f"User {email} was reset")
-                    print(f"Created reset marker at {reset_marker}")
+                    logger.debug("Created reset marker at %s", reset_marker)
                 
-                print(f"Successfully deleted settings for user: {email}")
+                _RESET_CACHE[email] = (time.monotonic(), True)
+                logger.debug("Successfully deleted settings for user: %s", email)
                 return True
             else:
-                print(f"Failed to delete settings for user: {email}")
+                logger.warning("Failed to delete settings for user: %s", email)
                 return False
                 
-        except Exception as e:
-            print(f"Error deleting settings for {email}: {str(e)}")
+        except Exception:
+            logger.exception("Error deleting settings for %s", email)
             return False
     
     def check_if_user_reset(self, email):
@@ -569,13 +673,20 @@ class UserSettings:
         """
         if not email:
             return False
+        
+        # The status rarely changes, and changes made here update the cache directly
+        now = time.monotonic()
+        cached = _RESET_CACHE.get(email)
+        if cached is not None and now - cached[0] < _RESET_CACHE_TTL:
+            return cached[1]
             
         try:
-            from utils.reset_manager import ResetManager
             reset_manager = ResetManager()
-            return reset_manager.check_if_reset(email)
-        except Exception as e:
+            was_reset = reset_manager.check_if_reset(email)
+        except Exception:
             # Fallback to direct file check if ResetManager is not available
-            sanitized_email = email.replace('@', '_at_').replace('.', '_dot_')
-            reset_marker = os.path.join(self.data_dir, "reset_users", f"{sanitized_email}.reset")
-            return os.path.exists(reset_marker)
+            reset_marker = self._reset_marker_path(email)
+            was_reset = os.path.exists(reset_marker)
+        
+        _RESET_CACHE[email] = (now, was_reset)
+        return was_reset
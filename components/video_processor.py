@@ -1,37 +1,237 @@
 import re
 import os
+import logging
+import atexit
+import base64
+import zlib
+import asyncio
+import threading
 import requests
-from pytube import YouTube
-from youtube_transcript_api import YouTubeTranscriptApi
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.google_adk_manager import GoogleADKManager
+from utils.llm_cache import LLMCache
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+try:
+    # requests 2.26+ adds br to this when a brotli decoder is installed
+    from requests.utils import DEFAULT_ACCEPT_ENCODING
+except ImportError:
+    DEFAULT_ACCEPT_ENCODING = 'gzip, deflate'
+
 # Configure requests with custom headers
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36',
     'Accept-Language': 'en-US,en;q=0.9',
+    # gzip and deflate, plus br when a brotli decoder is installed, so responses are
+    # only ever compressed in formats urllib3 can transparently decompress
+    'Accept-Encoding': DEFAULT_ACCEPT_ENCODING,
+    'Connection': 'keep-alive',
 }
 
+# One pooled session for all YouTube requests, so connections (and their TLS
+# handshakes) are reused across videos; transient server errors are retried, but
+# rate limiting (429) is not, since more requests would only prolong the block
+_SESSION = requests.Session()
+_SESSION.headers.update(HEADERS)
+_adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504])
+)
+_SESSION.mount('https://', _adapter)
+_SESSION.mount('http://', _adapter)
+atexit.register(_SESSION.close)
+
+# Seconds a fetched transcript is reused before it is fetched again
+TRANSCRIPT_CACHE_TTL = 7 * 24 * 3600
+
+# Transcripts by video ID, so repeat videos skip YouTube and Gemini entirely
+_TRANSCRIPT_CACHE = LLMCache("transcripts", maxsize=256, ttl=TRANSCRIPT_CACHE_TTL, persist=True)
+
+# Sample transcript used when no real transcript can be extracted
+_SAMPLE_TRANSCRIPT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'sample_transcript_clean.txt'
+)
+
+# Seconds a video YouTube reported as having no transcript is not retried
+FAILED_TRANSCRIPT_TTL = 3600
+
+# Video IDs YouTube recently reported as having no transcript
+_FAILED_TRANSCRIPT_CACHE = LLMCache("transcript_failures", maxsize=1024, ttl=FAILED_TRANSCRIPT_TTL)
+
+# Transcripts shorter than this (in UTF-8 bytes) are cached uncompressed
+_MIN_COMPRESS_BYTES = 256
+
+# Fallback results that describe a failure rather than the video, and are never cached
+_UNCACHEABLE_TRANSCRIPT_PREFIXES = ("[DEMO MODE]", "Unable to extract", "Error")
+
+# Caption text from legacy dict entries and from 1.x transcript snippets
+_get_text = itemgetter('text')
+_get_snippet_text = attrgetter('text')
+
+# Regular expression to extract video ID from YouTube URL
+_YOUTUBE_ID_RE = re.compile(r'(?:youtube\.com\/(?:[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|\S*?[?&]v=)|youtu\.be\/)([a-zA-Z0-9_-]{11})')
+
+# Transcript artifacts: SRT timestamps or sequence numbers, and runs of whitespace
+_SRT_RE = re.compile(r'\d+:\d+:\d+,\d+ --> \d+:\d+:\d+,\d+|^\d+$', re.MULTILINE)
+_WS_RE = re.compile(r'\s+')
+
+
+def clean_transcript(text):
+    """Clean the transcript text by removing timestamps and other artifacts"""
+    # Remove SRT timestamps and sequence numbers in one pass, then extra whitespace
+    return _WS_RE.sub(' ', _SRT_RE.sub('', text)).strip()
+
+
+@lru_cache(maxsize=256)
+def parse_video_id(url):
+    """
+    Extract the YouTube video ID from a URL.
+    
+    Args:
+        url (str): YouTube video URL
+        
+    Returns:
+        str: YouTube video ID
+    """
+    # Every URL the pattern accepts contains "youtu", so anything else is rejected without the regex
+    match = _YOUTUBE_ID_RE.search(url) if 'youtu' in url else None
+    
+    if match:
+        return match.group(1)
+    else:
+        raise ValueError("Invalid YouTube URL. Please provide a valid YouTube video URL.")
+
+
+def fetch_transcript_text(video_id, languages=('en',)):
+    """
+    Fetch a video's captions through YouTubeTranscriptApi using the shared session.
+    
+    Args:
+        video_id (str): YouTube video ID
+        languages (tuple): Preferred caption languages, in order
+        
+    Returns:
+        str: Caption text joined into one string
+    """
+    # Imported on first use so loading this module stays cheap
+    from youtube_transcript_api import YouTubeTranscriptApi
+    
+    if not hasattr(YouTubeTranscriptApi, 'fetch'):
+        # youtube-transcript-api before 1.0 only has the static API, which opens its own connections
+        transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=list(languages))
+        return ' '.join(map(_get_text, transcript_list)) if transcript_list else ''
+    
+    api = YouTubeTranscriptApi(http_client=_SESSION)
+    return ' '.join(map(_get_snippet_text, api.fetch(video_id, languages=list(languages))))
+
+
+def _is_no_transcript_error(error):
+    """
+    Check whether a YouTubeTranscriptApi error means the video has no transcript at all.
+    
+    Args:
+        error (Exception): Error raised while fetching the transcript
+        
+    Returns:
+        bool: True for missing or disabled transcripts and unavailable videos,
+            False for anything that may succeed on a retry
+    """
+    try:
+        from youtube_transcript_api import NoTranscriptFound, TranscriptsDisabled, VideoUnavailable
+    except ImportError:
+        return False
+    return isinstance(error, (NoTranscriptFound, TranscriptsDisabled, VideoUnavailable))
+
+
+def _pack_transcript(text):
+    """
+    Compress a transcript for the cache; natural-language text shrinks several times over.
+    
+    Args:
+        text (str): Transcript text
+        
+    Returns:
+        str or dict: The text itself if short, otherwise {'zlib': base64 of the compressed text}
+    """
+    data = text.encode('utf-8')
+    if len(data) < _MIN_COMPRESS_BYTES:
+        return text
+    return {'zlib': base64.b64encode(zlib.compress(data, 6)).decode('ascii')}
+
+
+def _unpack_transcript(value):
+    """
+    Restore a transcript stored by _pack_transcript.
+    
+    Args:
+        value (str or dict): Cached value
+        
+    Returns:
+        str: Transcript text
+    """
+    if isinstance(value, dict):
+        return zlib.decompress(base64.b64decode(value['zlib'])).decode('utf-8')
+    return value
+
+
+@lru_cache(maxsize=4)
+def _read_sample_transcript(path):
+    """
+    Read the sample transcript once per process; every demo fallback then reuses it.
+    
+    Args:
+        path (str): Sample transcript file
+        
+    Returns:
+        str: Sample transcript content
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return file.read().strip()
+    except Exception as e:
+        logger.warning("Error loading sample transcript: %s", e)
+        # Fallback hardcoded sample
+        return "This is a sample transcript about artificial intelligence and machine learning technologies. AI and ML are transforming how we interact with technology and solve complex problems. Machine learning enables systems to learn from data and improve over time without explicit programming."
+
+
 class VideoProcessor:
+    # Path to the sample transcript file
+    sample_transcript_path = _SAMPLE_TRANSCRIPT_PATH
+    
     def __init__(self):
         """Initialize the VideoProcessor class."""
-        try:
-            self.gemini_manager = GoogleADKManager()
-        except Exception as e:
-            print(f"Warning: Could not initialize Gemini manager: {e}")
-            self.gemini_manager = None
+        # Created on first use by gemini_manager; False once creating it has failed
+        self._gemini_manager = None
         
-        # Path to the sample transcript file
-        self.sample_transcript_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-            'sample_transcript_clean.txt'
-        )
+    @property
+    def gemini_manager(self):
+        """
+        Get the Gemini manager, importing and creating it only when a transcript needs it.
         
+        Returns:
+            GoogleADKManager: Shared manager, or None if it could not be initialized
+        """
+        if self._gemini_manager is None:
+            try:
+                from utils.google_adk_manager import get_adk_manager
+                self._gemini_manager = get_adk_manager()
+            except Exception as e:
+                logger.warning("Could not initialize Gemini manager: %s", e)
+                self._gemini_manager = False
+        return self._gemini_manager or None
+    
     def extract_video_id(self, url):
         """
         Extract the YouTube video ID from a URL.
@@ -42,14 +242,7 @@ class VideoProcessor:
         Returns:
             str: YouTube video ID
         """
-        # Regular expression to extract video ID from YouTube URL
-        youtube_regex = r'(?:youtube\.com\/(?:[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|\S*?[?&]v=)|youtu\.be\/)([a-zA-Z0-9_-]{11})'
-        match = re.search(youtube_regex, url)
-        
-        if match:
-            return match.group(1)
-        else:
-            raise ValueError("Invalid YouTube URL. Please provide a valid YouTube video URL.")
+        return parse_video_id(url)
     
     def load_sample_transcript(self):
         """
@@ -58,13 +251,7 @@ class VideoProcessor:
         Returns:
             str: Sample transcript content
         """
-        try:
-            with open(self.sample_transcript_path, 'r', encoding='utf-8') as file:
-                return file.read().strip()
-        except Exception as e:
-            print(f"Error loading sample transcript: {e}")
-            # Fallback hardcoded sample
-            return "This is a sample transcript about artificial intelligence and machine learning technologies. AI and ML are transforming how we interact with technology and solve complex problems. Machine learning enables systems to learn from data and improve over time without explicit programming."
+        return _read_sample_transcript(self.sample_transcript_path)
     
     def get_video_info(self, video_id):
         """
@@ -106,72 +293,111 @@ class VideoProcessor:
                 'url': f"https://www.youtube.com/watch?v={video_id}"
             }
         
-    def extract_transcript(self, video_id):
+    def extract_transcript(self, video_id, force_refresh=False):
+        """
+        Extract transcript from a YouTube video, reusing a previously extracted one.
+        
+        Videos that YouTube recently reported as having no transcript (and that no
+        other source could transcribe) go straight to the demo transcript, so they
+        don't trigger another Gemini transcription.
+        
+        Args:
+            video_id (str): YouTube video ID
+            force_refresh (bool, optional): Ignore cached results (including recent failures)
+                and extract the transcript again
+            
+        Returns:
+            str: Transcript text
+        """
+        if not force_refresh:
+            cached = _TRANSCRIPT_CACHE.get(video_id)
+            if cached:
+                cached = _unpack_transcript(cached)
+                logger.info("✓ Using cached transcript for video ID: %s", video_id)
+                return cached
+            
+            if _FAILED_TRANSCRIPT_CACHE.get(video_id):
+                logger.info("No transcript could be extracted recently for video ID: %s", video_id)
+                return self._demo_transcript()
+        
+        transcript, no_transcript = self._extract_transcript_uncached(video_id)
+        if transcript and not transcript.startswith(_UNCACHEABLE_TRANSCRIPT_PREFIXES):
+            _TRANSCRIPT_CACHE.set(video_id, _pack_transcript(transcript))
+            _FAILED_TRANSCRIPT_CACHE.delete(video_id)
+        elif no_transcript:
+            # Only remember videos YouTube says have no transcript; transient errors
+            # (network failures, rate limits, timeouts) are retried on the next call
+            _FAILED_TRANSCRIPT_CACHE.set(video_id, True)
+        return transcript
+    
+    def _extract_transcript_uncached(self, video_id):
         """
         Extract transcript from a YouTube video using a three-tier fallback system:
         1. YouTubeTranscriptApi (most reliable)
-        2. Gemini AI transcription (fallback)
+        2. Gemini AI transcription (fallback, only when the manager provides it)
         3. Sample transcript (demo fallback)
         
         Args:
             video_id (str): YouTube video ID
             
         Returns:
-            str: Transcript text
+            tuple: (transcript text, whether YouTube reported that the video has no
+                transcript - a permanent failure, unlike network errors)
         """
-        def clean_transcript(text):
-            """Clean the transcript text by removing timestamps and other artifacts"""
-            # Remove SRT timestamps
-            text = re.sub(r'\d+:\d+:\d+,\d+ --> \d+:\d+:\d+,\d+', '', text)
-            # Remove sequence numbers
-            text = re.sub(r'^\d+$', '', text, flags=re.MULTILINE)
-            # Remove extra whitespace
-            text = re.sub(r'\s+', ' ', text).strip()
-            return text
-
-        print(f"Attempting to get transcript for video ID: {video_id}", flush=True)
+        logger.debug("Attempting to get transcript for video ID: %s", video_id)
+        no_transcript = False
         
         # Tier 1: Try YouTubeTranscriptApi (most reliable and fast)
         try:
-            print("Tier 1: Trying YouTubeTranscriptApi...", flush=True)
-            transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=['en'])
-            if transcript_list:
-                transcript = ' '.join(entry['text'] for entry in transcript_list)
-                if transcript and len(transcript.strip()) > 50:  # Ensure meaningful content
-                    print("✓ Successfully extracted transcript using YouTubeTranscriptApi", flush=True)
-                    return transcript
+            logger.debug("Tier 1: Trying YouTubeTranscriptApi...")
+            transcript = fetch_transcript_text(video_id)
+            if transcript and len(transcript.strip()) > 50:  # Ensure meaningful content
+                logger.info("✓ Successfully extracted transcript using YouTubeTranscriptApi")
+                return transcript, False
         except Exception as e:
-            print(f"✗ YouTubeTranscriptApi failed: {str(e)}", flush=True)
+            logger.warning("✗ YouTubeTranscriptApi failed: %s", e)
+            no_transcript = _is_no_transcript_error(e)
         
-        # Tier 2: Try Gemini AI transcription (slower but more capable)
-        if self.gemini_manager:
+        # Tier 2: Try Gemini AI transcription (slower but more capable). GoogleADKManager
+        # doesn't provide transcribe_youtube_video yet, so the tier is skipped until it does;
+        # otherwise every fallback would be a guaranteed AttributeError
+        if self.gemini_manager and hasattr(self.gemini_manager, 'transcribe_youtube_video'):
             try:
-                print("Tier 2: Trying Gemini AI transcription...", flush=True)
+                logger.debug("Tier 2: Trying Gemini AI transcription...")
                 transcript = self.gemini_manager.transcribe_youtube_video(video_id)
                 
                 # Check if Gemini returned a valid transcript
                 if transcript and not transcript.startswith("Failed to transcribe") and len(transcript.strip()) > 50:
-                    print("✓ Successfully extracted transcript using Gemini AI", flush=True)
-                    return transcript
+                    logger.info("✓ Successfully extracted transcript using Gemini AI")
+                    return transcript, False
                 else:
-                    print("✗ Gemini AI returned insufficient transcript content", flush=True)
+                    logger.warning("✗ Gemini AI returned insufficient transcript content")
             except Exception as e:
-                print(f"✗ Gemini AI transcription failed: {str(e)}", flush=True)
+                logger.warning("✗ Gemini AI transcription failed: %s", e)
         else:
-            print("✗ Gemini manager not available", flush=True)
+            logger.warning("✗ Gemini transcription not available")
         
         # Tier 3: Use sample transcript for demonstration purposes
+        return self._demo_transcript(), no_transcript
+    
+    def _demo_transcript(self):
+        """
+        Build the sample transcript returned when no real transcript can be extracted.
+        
+        Returns:
+            str: Sample transcript marked as demo content, or an error message
+        """
         try:
-            print("Tier 3: Using sample transcript for demonstration...", flush=True)
+            logger.debug("Tier 3: Using sample transcript for demonstration...")
             sample_transcript = self.load_sample_transcript()
             
             # Add a note about using sample content
             demo_message = f"[DEMO MODE] The following is a sample transcript as the original video transcript could not be extracted:\n\n{sample_transcript}"
-            print("✓ Loaded sample transcript for demonstration", flush=True)
+            logger.info("✓ Loaded sample transcript for demonstration")
             return demo_message
             
         except Exception as e:
-            print(f"✗ Even sample transcript failed: {str(e)}", flush=True)
+            logger.warning("✗ Even sample transcript failed: %s", e)
             return "Unable to extract transcript from any source. Please try a different video or check your internet connection."
     
     def process_video(self, url):
@@ -203,7 +429,7 @@ class VideoProcessor:
             
             # Validate transcript length for meaningful content
             if transcript and len(transcript.strip()) < 10:
-                print("Warning: Very short transcript detected", flush=True)
+                logger.warning("Very short transcript detected")
                 # Still proceed - the sample transcript will be used for demo
             
             return video_info, transcript
@@ -211,7 +437,7 @@ class VideoProcessor:
         except ValueError as e:
             # Handle invalid URL error
             error_msg = str(e)
-            print(f"URL Error: {error_msg}", flush=True)
+            logger.warning("URL Error: %s", error_msg)
             # Create a minimal video info for error display
             video_info = {
                 'id': 'error',
@@ -224,7 +450,7 @@ class VideoProcessor:
         except Exception as e:
             # Handle other errors - still try to provide sample transcript for demo
             error_msg = str(e)
-            print(f"Processing Error: {error_msg}", flush=True)
+            logger.warning("Processing Error: %s", error_msg)
             
             # Create a minimal video info for error display
             video_info = {
@@ -241,3 +467,63 @@ class VideoProcessor:
                 return video_info, demo_message
             except:
                 return video_info, f"Error processing video: {error_msg}"
+    
+    async def aextract_transcript(self, video_id):
+        """
+        Extract a transcript without blocking the calling event loop.
+        
+        The fetch runs on a worker thread (sharing the pooled session and the
+        transcript cache), so many videos can be awaited concurrently.
+        
+        Args:
+            video_id (str): YouTube video ID
+            
+        Returns:
+            str: Transcript text
+        """
+        return await asyncio.to_thread(self.extract_transcript, video_id)
+    
+    async def aprocess_video(self, url):
+        """
+        Process a YouTube video without blocking the calling event loop.
+        
+        Args:
+            url (str): YouTube video URL
+            
+        Returns:
+            tuple: (video_info, transcript)
+        """
+        return await asyncio.to_thread(self.process_video, url)
+    
+    def process_videos(self, urls, max_workers=8, progress_callback=None):
+        """
+        Process several YouTube videos (e.g. a playlist) concurrently.
+        
+        Fetching is network-bound, so the videos are processed on a thread pool
+        instead of one after the other; the pooled HTTP session and the transcript
+        cache are both safe to share between the threads.
+        
+        Args:
+            urls (list): YouTube video URLs
+            max_workers (int, optional): Maximum number of videos processed at once
+            progress_callback (callable, optional): Called as progress_callback(done, total)
+                after each video finishes
+            
+        Returns:
+            list: One (video_info, transcript) tuple per URL, in URL order
+        """
+        total = len(urls)
+        done = 0
+        
+        def process(url):
+            nonlocal done
+            result = self.process_video(url)
+            if progress_callback is not None:
+                with progress_lock:
+                    done += 1
+                    progress_callback(done, total)
+            return result
+        
+        progress_lock = threading.Lock()
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total or 1))) as executor:
+            return list(executor.map(process, urls))
@@ -11,13 +11,17 @@ from components.summarizer_agent import SummarizerAgent
 from components.quiz_agent import QuizAgent
 from components.flashcard_agent import FlashcardAgent
 from components.learning_path_agent import LearningPathAgent
-from components.chat_assistant_agent import ChatAssistantAgent
+from components.chat_assistant_agent import ChatAssistantAgent, ChatContext, new_chat_window
 from components.user_settings import UserSettings
 from utils.session_state import initialize_session_state
+from utils.logging_setup import configure_logging
 
 # Load environment variables
 load_dotenv()
 
+# Route agent log messages through a background writer (once per process)
+configure_logging()
+
 # Page configuration
 st.set_page_config(
     page_title="CognitoStream: AI-Enhanced Video Learning Platform",
@@ -125,8 +129,8 @@ def main():
             print(f"Loaded settings for manually entered email: {email}")
     
     # Initialize the AI model with the selected model from session state
-    from utils.google_adk_manager import GoogleADKManager
-    adk_manager = GoogleADKManager()
+    from utils.google_adk_manager import get_adk_manager
+    adk_manager = get_adk_manager()
     adk_manager.set_model(st.session_state.ai_model)
     
     # Handle programmatic navigation changes
@@ -196,8 +200,8 @@ def main():
         # Update the model if changed
         if selected_model != st.session_state.ai_model:
             st.session_state.ai_model = selected_model
-            from utils.google_adk_manager import GoogleADKManager
-            adk_manager = GoogleADKManager()
+            from utils.google_adk_manager import get_adk_manager
+            adk_manager = get_adk_manager()
             adk_manager.set_model(selected_model)
             st.success(f"Model updated to {selected_model}")
         
@@ -293,7 +297,9 @@ def display_video_processing():
                     # Generate and display video overview
                     with st.spinner("Generating video overview..."):
                         summarizer = SummarizerAgent()
-                        video_overview = summarizer.generate_overview(transcript, video_info)
+                        # The default-length summary comes back in the same call and is
+                        # cached, so the Summaries page can show it without another request
+                        video_overview, _ = summarizer.generate_overview_and_summary(transcript, video_info)
                         st.session_state.video_overview = video_overview
                     
                     # Display the overview
@@ -432,11 +438,13 @@ def display_quizzes():
             with st.spinner("Generating quiz questions..."):
                 try:
                     quiz_agent = QuizAgent()
+                    # Clicking again once a quiz is shown asks for new questions
                     questions = quiz_agent.generate_quiz(
                         st.session_state.transcript,
                         st.session_state.video_info,
                         num_questions,
-                        difficulty
+                        difficulty,
+                        force_refresh=bool(st.session_state.get('quiz_questions'))
                     )
                     
                     # Save to session state
@@ -484,26 +492,26 @@ def display_quizzes():
             
             # Show results after submission
             if st.session_state.quiz_submitted:
-                correct_count = 0
+                # Grade the whole quiz at once
+                user_answers = [
+                    st.session_state.quiz_answers.get(i)
+                    for i in range(len(st.session_state.quiz_questions))
+                ]
+                results = QuizAgent().evaluate_answers(st.session_state.quiz_questions, user_answers)
+                correct_count = sum(result['correct'] for result in results)
                 
                 st.subheader("Quiz Results")
-                for i, q in enumerate(st.session_state.quiz_questions):
-                    user_answer = st.session_state.quiz_answers.get(i)
-                    correct_answer = q['correct_answer']
-                    
-                    if user_answer == correct_answer:
+                for i, (q, user_answer, result) in enumerate(zip(st.session_state.quiz_questions, user_answers, results)):
+                    if result['correct']:
                         result_icon = "✅"
                         result_color = "green"
-                        correct_count += 1
-                        feedback = q.get('correct_feedback', "Great job! That's correct.")
                     else:
                         result_icon = "❌"
                         result_color = "red"
-                        feedback = q.get('incorrect_feedback', f"The correct answer is: {correct_answer}")
                     
                     st.markdown(f"**Question {i+1}:** {q['question']}")
                     st.markdown(f"Your answer: <span style='color:{result_color}'>{user_answer} {result_icon}</span>", unsafe_allow_html=True)
-                    st.markdown(f"**Feedback:** {feedback}")
+                    st.markdown(f"**Feedback:** {result['feedback']}")
                     st.markdown("---")
                 
                 # Display final score
@@ -556,11 +564,13 @@ def display_flashcards():
             with st.spinner("Generating flashcards..."):
                 try:
                     flashcard_agent = FlashcardAgent()
+                    # Clicking again once flashcards are shown asks for a new set
                     flashcards = flashcard_agent.generate_flashcards(
                         st.session_state.transcript,
                         st.session_state.video_info,
                         num_cards,
-                        focus_area
+                        focus_area,
+                        force_refresh=bool(st.session_state.get('flashcards'))
                     )
                     
                     # Save to session state
@@ -908,7 +918,8 @@ def display_learning_path():
                         user_progress=st.session_state.get('user_progress', 0),
                         video_history=st.session_state.get('video_history', []),
                         skill_level=skill_level,
-                        completed_milestones=st.session_state.get('completed_milestones', [])
+                        completed_milestones=st.session_state.get('completed_milestones', []),
+                        force_refresh=True
                     )
                     
                     st.session_state.learning_recommendations = recommendations
@@ -1093,6 +1104,10 @@ def display_chat_assistant():
             {"role": "assistant", "content": "Hello! I'm your learning assistant. How can I help you with your video learning today?"}
         ]
     
+    # Rolling window of the most recent messages sent along with each question
+    if "chat_window" not in st.session_state:
+        st.session_state.chat_window = new_chat_window(st.session_state.chat_messages)
+    
     # Display chat messages
     for message in st.session_state.chat_messages:
         with st.chat_message(message["role"]):
@@ -1114,20 +1129,33 @@ def display_chat_assistant():
             with st.spinner("Thinking..."):
                 chat_agent = ChatAssistantAgent()
                 
-                # Context for the agent
-                context = {
-                    "transcript": st.session_state.get("transcript", ""),
-                    "video_info": st.session_state.get("video_info", {}) or {},  # Ensure not None
-                    "summary": st.session_state.get("summary", {}) or {},  # Ensure not None
-                    "chat_history": st.session_state.chat_messages[:-1]  # Exclude the latest user message
-                }
+                # Context for the agent, rebuilt only when the video or its summary changes
+                source = (
+                    st.session_state.get("transcript", ""),
+                    st.session_state.get("video_info", {}),
+                    st.session_state.get("summary", {})
+                )
+                cached_source = st.session_state.get("chat_context_source")
+                if cached_source is None or any(a is not b for a, b in zip(source, cached_source)):
+                    st.session_state.chat_context = ChatContext.build({
+                        "transcript": source[0],
+                        "video_info": source[1] or {},  # Ensure not None
+                        "summary": source[2] or {}  # Ensure not None
+                    })
+                    st.session_state.chat_context_source = source
                 
-                response = chat_agent.generate_response(user_input, context)
+                response = chat_agent.generate_response(
+                    user_input,
+                    st.session_state.chat_context,
+                    chat_history=st.session_state.chat_window  # Doesn't include the latest user message yet
+                )
                 
                 st.write(response)
                 
                 # Add assistant response to chat history
                 st.session_state.chat_messages.append({"role": "assistant", "content": response})
+                st.session_state.chat_window.append(("user", user_input))
+                st.session_state.chat_window.append(("assistant", response))
 
 # User Settings Page
 def display_user_settings():
@@ -1285,9 +1313,7 @@ def display_user_settings():
                 existing_settings = user_settings.load_settings_by_email(user_email)
                 
                 # Merge with new settings, prioritizing the new ones
-                for key, value in existing_settings.items():
-                    if key not in settings_dict:
-                        settings_dict[key] = value
+                settings_dict = {**existing_settings, **settings_dict}
                 
                 success = user_settings.save_settings(settings_dict)
                 
@@ -1432,7 +1458,7 @@ def display_user_settings():
                     keys_to_clear = [
                         'user_name', 'user_email', 'user_progress', 'learning_interests',
                         'learning_goals', 'preferred_learning_style', 'learning_recommendations',
-                        'watched_videos', 'chat_messages', 'quiz_history', 'skill_level',
+                        'watched_videos', 'chat_messages', 'chat_window', 'quiz_history', 'skill_level',
                         'completed_milestones', 'learning_categories', 'learning_path'
                     ]
                     
@@ -0,0 +1,133 @@
+"""
+Query embeddings for the semantic response cache.
+
+By default queries are embedded with the Gemini embedding API. When
+EMBEDDING_MODEL_DIR points at an int8-quantized ONNX export of a sentence
+embedding model (e.g. all-MiniLM-L6-v2), queries are embedded locally on the CPU
+instead, which is much cheaper than a network round trip on every cache lookup.
+The local path needs the optional onnxruntime and tokenizers packages.
+
+Preparing the model directory (one-off):
+
+    optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 \\
+        --task feature-extraction <dir>
+    python -c "from utils.embeddings import quantize_model; quantize_model('<dir>')"
+"""
+
+import logging
+import os
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# File names inside the model directory
+ONNX_MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+# Longest query (in model tokens) that is embedded; the rest is truncated
+MAX_QUERY_TOKENS = 128
+
+
+def quantize_model(model_dir):
+    """
+    Quantize an exported ONNX embedding model to int8 weights.
+
+    Args:
+        model_dir (str): Directory containing the exported model.onnx
+
+    Returns:
+        str: Path of the quantized model
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE)
+    quantize_dynamic(
+        os.path.join(model_dir, ONNX_MODEL_FILE),
+        output_path,
+        weight_type=QuantType.QUInt8
+    )
+    return output_path
+
+
+class LocalEmbedder:
+    def __init__(self, model_dir):
+        """
+        Initialize a CPU embedder backed by a quantized ONNX sentence embedding model.
+
+        Args:
+            model_dir (str): Directory containing model_quantized.onnx and tokenizer.json
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self._ort = ort
+        self.model_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE)
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Quantized embedding model not found: {self.model_path}")
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(MAX_QUERY_TOKENS)
+
+        # One session per thread, created on first use in that thread
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            options = self._ort.SessionOptions()
+            options.graph_optimization_level = self._ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            session = self._ort.InferenceSession(
+                self.model_path, options, providers=['CPUExecutionProvider']
+            )
+            self._local.session = session
+        return session
+
+    def embed(self, text):
+        """
+        Embed a piece of text.
+
+        Args:
+            text (str): Text to embed
+
+        Returns:
+            numpy.ndarray: Mean-pooled embedding, or None if embedding failed
+        """
+        try:
+            session = self._session()
+            encoding = self.tokenizer.encode(text)
+            input_ids = np.asarray([encoding.ids], dtype=np.int64)
+            attention_mask = np.asarray([encoding.attention_mask], dtype=np.int64)
+
+            inputs = {'input_ids': input_ids, 'attention_mask': attention_mask}
+            input_names = {model_input.name for model_input in session.get_inputs()}
+            if 'token_type_ids' in input_names:
+                inputs['token_type_ids'] = np.asarray([encoding.type_ids], dtype=np.int64)
+
+            token_embeddings = session.run(None, inputs)[0][0]
+
+            # Mean pooling over the real (non-padding) tokens
+            mask = attention_mask[0].astype(np.float32)[:, None]
+            return (token_embeddings * mask).sum(axis=0) / max(mask.sum(), 1.0)
+        except Exception as e:
+            logger.warning("Error generating local embedding: %s", e)
+            return None
+
+
+def get_query_embedder():
+    """
+    Get the function used to embed cache queries.
+
+    Returns:
+        callable: Function returning an embedding vector (or None) for a text
+    """
+    model_dir = os.getenv("EMBEDDING_MODEL_DIR")
+    if model_dir:
+        try:
+            return LocalEmbedder(model_dir).embed
+        except Exception as e:
+            logger.info("Local embedding model unavailable, using Gemini embeddings: %s", e)
+
+    from utils.google_adk_manager import get_adk_manager
+    return lambda text: get_adk_manager().embed_text(text)
@@ -1,13 +1,55 @@
+import logging
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import google.generativeai as genai
+from google.api_core import exceptions as api_exceptions
+from google.api_core import retry as api_retry
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the text returned when generation fails, so callers can avoid caching failures
+FAILED_RESPONSE_PREFIX = "Failed to generate response"
+
+# Seconds before a single Gemini request is abandoned
+REQUEST_TIMEOUT = 60
+
+# Transient failures (rate limits, server errors, timeouts) are retried with exponential
+# backoff; anything else, such as an invalid request or blocked content, fails right away
+_TRANSIENT_RETRY = api_retry.Retry(
+    predicate=api_retry.if_exception_type(
+        api_exceptions.TooManyRequests,
+        api_exceptions.InternalServerError,
+        api_exceptions.ServiceUnavailable,
+        api_exceptions.DeadlineExceeded
+    ),
+    initial=1.0,
+    multiplier=2.0,
+    maximum=30.0,
+    timeout=120.0
+)
+
+# Passed to every Gemini call
+_REQUEST_OPTIONS = {"retry": _TRANSIENT_RETRY, "timeout": REQUEST_TIMEOUT}
+
+# Number of (model, system prompt) combinations whose GenerativeModel is kept
+MODEL_CACHE_SIZE = 64
+
+# Model used until the user picks another one
+DEFAULT_MODEL = "gemini-1.5-flash"
 
 class GoogleADKManager:
     _instance = None
     
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(GoogleADKManager, cls).__new__(cls)
-            cls._instance._initialize()
+            instance = super(GoogleADKManager, cls).__new__(cls)
+            # Only keep the instance once it is fully initialized, so a missing API key
+            # doesn't leave a half-configured singleton behind
+            instance._initialize()
+            cls._instance = instance
         return cls._instance
     
     def _initialize(self):
@@ -18,7 +60,19 @@ class GoogleADKManager:
         genai.configure(api_key=api_key)
         
         # Default model - can be overridden
-        self._model_name = "gemini-1.5-flash"
+        self._model_name = DEFAULT_MODEL
+        
+        # Smaller, faster model for first drafts that are checked before being used
+        self._cheap_model_name = "gemini-1.5-flash-8b"
+        
+        # Model used for text embeddings (semantic caching)
+        self._embedding_model = "models/text-embedding-004"
+        
+        # GenerativeModel per (model name, system prompt), least recently used first.
+        # The system prompt is built into the model as its system instruction once,
+        # so only the user prompt has to be converted on each call
+        self._models = OrderedDict()
+        self._models_lock = threading.Lock()
     
     def set_model(self, model_name):
         """
@@ -38,7 +92,195 @@ class GoogleADKManager:
         """
         return self._model_name
     
-    def generate_text(self, prompt, system_prompt=None, response_format=None, temperature=0.5, max_tokens=None):
+    def get_cheap_model(self):
+        """
+        Get the name of the smaller model used for first drafts
+        
+        Returns:
+            str: Cheap model name
+        """
+        return self._cheap_model_name
+    
+    def _get_generative_model(self, model_name, system_prompt=None):
+        """
+        Get the shared GenerativeModel for a model name and system prompt, creating it on first use
+        
+        Args:
+            model_name (str): Name of the model
+            system_prompt (str, optional): System instruction for the model
+            
+        Returns:
+            genai.GenerativeModel: Model client
+        """
+        key = (model_name, system_prompt)
+        with self._models_lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+            
+            model = genai.GenerativeModel(model_name=model_name, system_instruction=system_prompt)
+            self._models[key] = model
+            while len(self._models) > MODEL_CACHE_SIZE:
+                self._models.popitem(last=False)
+            return model
+    
+    def embed_text(self, text, task_type="semantic_similarity"):
+        """
+        Generate an embedding vector for a piece of text
+        
+        Args:
+            text (str): Text to embed
+            task_type (str, optional): Embedding task type hint for the model
+            
+        Returns:
+            list: Embedding vector, or None if embedding failed
+        """
+        try:
+            result = genai.embed_content(
+                model=self._embedding_model,
+                content=text,
+                task_type=task_type,
+                request_options=_REQUEST_OPTIONS
+            )
+            return result["embedding"]
+        except Exception as e:
+            logger.warning("Error generating embedding with Gemini: %s", e)
+            return None
+    
+    def generate_texts(self, requests, max_workers=4):
+        """
+        Generate several texts concurrently
+        
+        The Gemini SDK blocks on network I/O, so requests are dispatched on a
+        thread pool and their round trips overlap.
+        
+        Args:
+            requests (list): List of keyword-argument dicts for generate_text
+            max_workers (int, optional): Maximum number of concurrent requests
+            
+        Returns:
+            list: Generated text responses, in the same order as requests
+        """
+        if len(requests) <= 1:
+            return [self.generate_text(**request) for request in requests]
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(requests))) as executor:
+            return list(executor.map(lambda request: self.generate_text(**request), requests))
+    
+    def _prepare_request(self, prompt, system_prompt, response_format, temperature, max_tokens, history=None, response_schema=None, model_name=None, context=None):
+        """
+        Build the model, prompt contents and generation config for a request
+        
+        Args:
+            prompt (str): User prompt
+            system_prompt (str, optional): System prompt to set context
+            response_format (str, optional): Format for response (json, text)
+            temperature (float): Sampling temperature
+            max_tokens (int, optional): Maximum tokens in response
+            history (iterable, optional): Previous (role, content) conversation turns
+            response_schema (type, optional): Pydantic model the JSON response must conform to
+            model_name (str, optional): Model to use instead of the current model setting
+            context (str, optional): Stable per-conversation context sent as the first user
+                turn, ahead of the history, so the prompt prefix stays the same across turns
+            
+        Returns:
+            tuple: (model, contents, generation_config)
+        """
+        # Create generation configuration
+        generation_config = genai.GenerationConfig(
+            temperature=temperature
+        )
+        
+        if max_tokens:
+            generation_config.max_output_tokens = max_tokens
+        
+        if response_schema is not None:
+            # Constrained decoding: the model can only produce JSON matching the schema
+            generation_config.response_mime_type = "application/json"
+            generation_config.response_schema = response_schema
+        
+        # Reuse the model client for the requested (or current) model and system prompt,
+        # which Gemini receives as the system instruction rather than as part of the prompt
+        model = self._get_generative_model(model_name or self._model_name, system_prompt or None)
+        
+        # Prepare the complete prompt with formatting instructions
+        complete_prompt = prompt
+        
+        # For JSON format without a schema, add JSON formatting instruction
+        if response_format == "json" and response_schema is None:
+            complete_prompt = f"{prompt}\n\nFormat your entire response as a valid JSON object without any markdown formatting or code blocks. Do not include ```json or ``` tags."
+        
+        contents = complete_prompt
+        if history or context:
+            contents = self._conversation_contents(history or (), contents, context)
+        
+        return model, contents, generation_config
+    
+    @staticmethod
+    def _conversation_contents(history, prompt, context=None):
+        """
+        Convert previous conversation turns plus the new prompt into Gemini contents
+        
+        Args:
+            history (iterable): Previous (role, content) turns ("user" or "assistant")
+            prompt (str): New user prompt
+            context (str, optional): Context placed at the start of the first user turn
+            
+        Returns:
+            list: Gemini content dicts with alternating user/model roles
+        """
+        turns = []
+        leading = [("user", context)] if context else []
+        for role, content in leading + list(history) + [("user", prompt)]:
+            role = "model" if role == "assistant" else "user"
+            if not turns and role == "model":
+                # Conversations have to start with a user turn
+                continue
+            if turns and turns[-1]["role"] == role:
+                turns[-1]["parts"].append(content)
+            else:
+                turns.append({"role": role, "parts": [content]})
+        return turns
+    
+    def generate_text_stream(self, prompt, system_prompt=None, response_format=None, temperature=0.5, max_tokens=None, history=None, response_schema=None, model_name=None, context=None):
+        """
+        Generate text using Google Gemini, yielding the response as it arrives
+        
+        Args:
+            prompt (str): User prompt
+            system_prompt (str, optional): System prompt to set context
+            response_format (str, optional): Format for response (json, text)
+            temperature (float, optional): Sampling temperature
+            max_tokens (int, optional): Maximum tokens in response
+            history (iterable, optional): Previous (role, content) conversation turns
+            response_schema (type, optional): Pydantic model the JSON response must conform to
+            model_name (str, optional): Model to use instead of the current model setting
+            context (str, optional): Stable per-conversation context sent as the first user
+                turn, ahead of the history, so the prompt prefix stays the same across turns
+            
+        Yields:
+            str: Chunks of the generated text, in order
+        """
+        try:
+            model, contents, generation_config = self._prepare_request(
+                prompt, system_prompt, response_format, temperature, max_tokens, history, response_schema, model_name, context
+            )
+            response = model.generate_content(
+                contents,
+                generation_config=generation_config,
+                stream=True,
+                request_options=_REQUEST_OPTIONS
+            )
+            
+            for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+                    
+        except Exception as e:
+            logger.warning("Error streaming text with Gemini: %s", e)
+    
+    def generate_text(self, prompt, system_prompt=None, response_format=None, temperature=0.5, max_tokens=None, history=None, response_schema=None, model_name=None, context=None):
         """
         Generate text using Google Gemini Flash model
         
@@ -48,49 +290,31 @@ class GoogleADKManager:
             response_format (str, optional): Format for response (json, text)
             temperature (float, optional): Sampling temperature
             max_tokens (int, optional): Maximum tokens in response
+            history (iterable, optional): Previous (role, content) conversation turns
+            response_schema (type, optional): Pydantic model the JSON response must conform to
+            model_name (str, optional): Model to use instead of the current model setting
+            context (str, optional): Stable per-conversation context sent as the first user
+                turn, ahead of the history, so the prompt prefix stays the same across turns
             
         Returns:
             str: Generated text response
         """
         try:
-            # Create generation configuration
-            generation_config = genai.GenerationConfig(
-                temperature=temperature
+            model, contents, generation_config = self._prepare_request(
+                prompt, system_prompt, response_format, temperature, max_tokens, history, response_schema, model_name, context
+            )
+            response = model.generate_content(
+                contents,
+                generation_config=generation_config,
+                request_options=_REQUEST_OPTIONS
             )
-            
-            if max_tokens:
-                generation_config.max_output_tokens = max_tokens
-            
-            # Set up the model with the current model setting
-            model = genai.GenerativeModel(model_name=self._model_name)
-            
-            # Prepare the complete prompt with formatting instructions
-            complete_prompt = prompt
-            
-            # For JSON format, add JSON formatting instruction
-            if response_format == "json":
-                complete_prompt = f"{prompt}\n\nFormat your entire response as a valid JSON object without any markdown formatting or code blocks. Do not include ```json or ``` tags."
-            
-            # Add system prompt if provided
-            if system_prompt:
-                # Use the system prompt with the appropriate formatting
-                initial_message = f"System: {system_prompt}\n\nUser: {complete_prompt}"
-                response = model.generate_content(
-                    initial_message,
-                    generation_config=generation_config
-                )
-            else:
-                # Direct prompt without system context
-                response = model.generate_content(
-                    complete_prompt,
-                    generation_config=generation_config
-                )
             
             # Process the response
             response_text = response.text
             
-            # If JSON format is requested, clean up the response
-            if response_format == "json":
+            # If JSON format is requested without a schema, clean up the response
+            # (schema-constrained responses are bare JSON already)
+            if response_format == "json" and response_schema is None:
                 # Remove code block markers if present
                 if "```json" in response_text:
                     response_text = response_text.replace("```json", "").replace("```", "")
@@ -106,9 +330,23 @@ class GoogleADKManager:
             return response_text
             
         except Exception as e:
-            print(f"Error generating text with Gemini: {str(e)}")
+            logger.warning("Error generating text with Gemini: %s", e)
             # Return a fallback response
             if response_format == "json":
                 return '{"error": "Failed to generate response", "message": "' + str(e) + '"}'
             else:
-                return f"Failed to generate response: {str(e)}"
+                return f"{FAILED_RESPONSE_PREFIX}: {str(e)}"
+
+
+@lru_cache(maxsize=1)
+def get_adk_manager():
+    """
+    Get the process-wide GoogleADKManager, creating it on first use.
+    
+    Streamlit rebuilds the agents on every rerun; they all share this instance
+    (and its configured API client) instead of going through construction again.
+    
+    Returns:
+        GoogleADKManager: Shared manager instance
+    """
+    return GoogleADKManager()
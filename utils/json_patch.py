@@ -0,0 +1,100 @@
+"""
+Minimal JSON Patch (RFC 6902) support for storing small revisions of JSON documents.
+
+Only the operations needed to describe the difference between two documents are
+produced and understood: add, remove and replace.
+"""
+
+import copy
+
+
+def _escape(token):
+    """Escape a key for use in a JSON Pointer."""
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token):
+    """Turn a JSON Pointer reference token back into a key."""
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def make_patch(source, target, path=""):
+    """
+    Compute the operations that turn source into target.
+
+    Objects are compared key by key and lists of the same length item by item, so
+    changing one field deep inside a document produces a single small operation.
+    Anything else that differs is replaced as a whole.
+
+    Args:
+        source (any): Original JSON value
+        target (any): Updated JSON value
+        path (str): JSON Pointer of the values being compared
+
+    Returns:
+        list: Patch operations (empty if the values are equal)
+    """
+    if source == target:
+        return []
+
+    if isinstance(source, dict) and isinstance(target, dict):
+        patch = []
+        for key in source:
+            if key not in target:
+                patch.append({'op': 'remove', 'path': f"{path}/{_escape(key)}"})
+        for key, value in target.items():
+            child_path = f"{path}/{_escape(key)}"
+            if key not in source:
+                patch.append({'op': 'add', 'path': child_path, 'value': value})
+            else:
+                patch.extend(make_patch(source[key], value, child_path))
+        return patch
+
+    if isinstance(source, list) and isinstance(target, list) and len(source) == len(target):
+        patch = []
+        for index, (old_item, new_item) in enumerate(zip(source, target)):
+            patch.extend(make_patch(old_item, new_item, f"{path}/{index}"))
+        return patch
+
+    return [{'op': 'replace', 'path': path, 'value': target}]
+
+
+def apply_patch(document, patch):
+    """
+    Apply patch operations to a document.
+
+    Args:
+        document (any): JSON value to patch (not modified)
+        patch (list): Operations from make_patch
+
+    Returns:
+        any: The patched value
+    """
+    document = copy.deepcopy(document)
+    for operation in patch:
+        value = copy.deepcopy(operation.get('value'))
+        if not operation['path']:
+            # The whole document was replaced
+            document = value
+            continue
+
+        tokens = [_unescape(token) for token in operation['path'].split('/')[1:]]
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+
+        last = tokens[-1]
+        if isinstance(parent, list):
+            last = len(parent) if last == '-' else int(last)
+            if operation['op'] == 'remove':
+                del parent[last]
+            elif operation['op'] == 'add':
+                parent.insert(last, value)
+            else:
+                parent[last] = value
+        elif operation['op'] == 'remove':
+            del parent[last]
+        else:
+            parent[last] = value
+
+    return document
@@ -0,0 +1,252 @@
+"""
+JSON helpers for parsing LLM responses.
+"""
+
+import os
+import re
+import json
+
+try:
+    # orjson parses and serializes several times faster than the standard library
+    import orjson
+except ImportError:
+    orjson = None
+
+# Raised by loads for malformed input (orjson's error subclasses json.JSONDecodeError)
+JSONDecodeError = json.JSONDecodeError
+
+
+# JSON array or object wrapped in a markdown code fence (```json ... ```)
+_JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*(\[.*?\]|\{.*?\})\s*```", re.DOTALL)
+
+
+def extract_json(text):
+    """
+    Extract the JSON payload from an LLM response that may be wrapped in a code fence.
+
+    Args:
+        text (str): Model response
+
+    Returns:
+        str: The JSON text, ready for loads
+    """
+    match = _JSON_BLOCK_RE.search(text)
+    if match:
+        return match.group(1)
+
+    # An unterminated fence (e.g. a truncated response) or one that was partly
+    # stripped can leave the opening backticks or a bare "json" language tag behind
+    text = text.strip()
+    if text.startswith('```'):
+        text = text[3:].lstrip()
+    if text[:4].lower() == 'json':
+        text = text[4:].lstrip()
+    return text
+
+
+def loads(data):
+    """
+    Parse a JSON document.
+
+    Args:
+        data (str or bytes): JSON text
+
+    Returns:
+        any: Parsed value
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj, indent=False):
+    """
+    Serialize a value to UTF-8 encoded JSON.
+
+    Non-string dictionary keys (e.g. question numbers) are converted to strings,
+    as the standard library does.
+
+    Args:
+        obj (any): JSON-serializable value
+        indent (bool): Pretty-print with two-space indentation instead of compact output
+
+    Returns:
+        bytes: JSON text
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj, indent=False):
+    """
+    Serialize a value to JSON.
+
+    Args:
+        obj (any): JSON-serializable value
+        indent (bool): Pretty-print with two-space indentation instead of compact output
+
+    Returns:
+        str: JSON text
+    """
+    return dumps_bytes(obj, indent).decode('utf-8')
+
+
+def read_json(file_path):
+    """
+    Load a JSON file.
+
+    The file is read as bytes, which orjson parses without decoding to str first.
+
+    Args:
+        file_path (str): File to read
+
+    Returns:
+        any: Parsed value
+    """
+    with open(file_path, 'rb') as f:
+        return loads(f.read())
+
+
+def write_json_atomic(file_path, obj, indent=False):
+    """
+    Write a value to a JSON file so readers never see a partially written file.
+
+    The data goes to a temporary file in the same directory, which then replaces
+    the target in one step; a crash mid-write leaves the previous file intact.
+
+    Args:
+        file_path (str): Destination file
+        obj (any): JSON-serializable value
+        indent (bool): Pretty-print with two-space indentation
+    """
+    write_bytes_atomic(file_path, dumps_bytes(obj, indent=indent))
+
+
+def write_bytes_atomic(file_path, data):
+    """
+    Write already serialized data to a file so readers never see a partial write.
+
+    Args:
+        file_path (str): Destination file
+        data (bytes): File contents
+    """
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class JSONStreamScanner:
+    def __init__(self):
+        """
+        Initialize a scanner that splits a streamed JSON array or object into its
+        top-level elements as soon as each one is complete.
+
+        Text before the opening bracket (such as a ```json fence) is ignored, as is
+        anything after the closing bracket.
+        """
+        self.container = None  # '[' or '{' once the top-level value has opened
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._element = []
+
+    def feed(self, chunk):
+        """
+        Consume the next chunk of text.
+
+        Args:
+            chunk (str): Next piece of the streamed response
+
+        Returns:
+            list: Raw text of each top-level element completed by this chunk
+                (for objects, each element is a '"key": value' member)
+        """
+        elements = []
+        for char in chunk:
+            if self.done:
+                break
+
+            if self._depth == 0:
+                if char in '[{':
+                    self.container = char
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                self._element.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '[{':
+                self._depth += 1
+            elif char in ']}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._flush(elements)
+                    self.done = True
+                    continue
+            elif char == ',' and self._depth == 1:
+                self._flush(elements)
+                continue
+
+            self._element.append(char)
+
+        return elements
+
+    def _flush(self, elements):
+        text = ''.join(self._element).strip()
+        self._element = []
+        if text:
+            elements.append(text)
+
+
+def iter_json_elements(chunks):
+    """
+    Parse a streamed JSON array or object incrementally.
+
+    Malformed elements are skipped, and a truncated trailing element is never
+    yielded, so everything received intact up to that point is still usable.
+
+    Args:
+        chunks (iterable): Text chunks of a JSON response, in order
+
+    Yields:
+        any: Each array item, or a (key, value) tuple for each object member
+    """
+    scanner = JSONStreamScanner()
+    for chunk in chunks:
+        for element in scanner.feed(chunk):
+            try:
+                if scanner.container == '{':
+                    yield next(iter(loads('{' + element + '}').items()))
+                else:
+                    yield loads(element)
+            except (ValueError, StopIteration):
+                continue
+
+        if scanner.done:
+            break
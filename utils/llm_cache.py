@@ -0,0 +1,318 @@
+"""
+Caching helpers for LLM responses so repeated prompts skip the network round trip.
+"""
+
+import logging
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.json_utils import read_json, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# Root directory for persisted cache entries
+CACHE_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "cache")
+
+# Default limit on the size of one namespace's persisted entries
+DEFAULT_MAX_DISK_BYTES = 64 * 1024 * 1024
+
+
+class LLMCache:
+    def __init__(self, namespace, maxsize=512, ttl=None, persist=False, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        """
+        Initialize an LRU response cache.
+
+        Args:
+            namespace (str): Name used to separate this cache from others on disk
+            maxsize (int): Maximum number of entries kept in memory
+            ttl (float, optional): Seconds before an entry expires (None keeps entries forever)
+            persist (bool): Whether entries are also written to disk so they survive restarts
+            max_disk_bytes (int, optional): Size the persisted entries may reach before the
+                oldest ones are removed (None lets them grow without limit)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.cache_dir = os.path.join(CACHE_ROOT, namespace) if persist else None
+        self.max_disk_bytes = max_disk_bytes
+
+        # Approximate size of the persisted entries, measured on the first write
+        self._disk_bytes = None
+
+        # key -> (expires_at, value), ordered from least to most recently used
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Lookup counters for monitoring how often the cache saves a request
+        self.hits = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        Build a stable cache key from the given parts.
+
+        Args:
+            *parts: Values that together identify a request (prompts, model, temperature, ...)
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        payload = "||".join(str(part) for part in parts)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a cached value.
+
+        Args:
+            key (str): Cache key from make_key
+
+        Returns:
+            any: Cached value, or None on a miss
+        """
+        value = self._lookup(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def stats(self):
+        """
+        Get the lookup counters.
+
+        Returns:
+            tuple: (hits, misses) since the cache was created
+        """
+        return self.hits, self.misses
+
+    def _lookup(self, key):
+        """Find a value in memory or on disk; returns None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    return value
+                # Expired - drop it and fall through to a miss
+                del self._entries[key]
+
+        if not self.cache_dir:
+            return None
+
+        # Fall back to the persisted copy
+        file_path = self._file_path(key)
+        try:
+            entry = read_json(file_path)
+        except (OSError, ValueError):
+            return None
+
+        expires_at = entry.get('expires_at')
+        if expires_at is not None and expires_at <= now:
+            self._remove_file(file_path)
+            return None
+
+        value = entry.get('value')
+        self._remember(key, expires_at, value)
+        return value
+
+    def set(self, key, value):
+        """
+        Store a value in the cache.
+
+        Args:
+            key (str): Cache key from make_key
+            value (any): JSON-serializable value to store
+        """
+        expires_at = time.time() + self.ttl if self.ttl else None
+        self._remember(key, expires_at, value)
+
+        if not self.cache_dir:
+            return
+
+        file_path = self._file_path(key)
+        try:
+            write_json_atomic(file_path, {'expires_at': expires_at, 'value': value})
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Error persisting cache entry: %s", e)
+            return
+
+        if self.max_disk_bytes:
+            self._track_disk_usage(file_path)
+
+    def delete(self, key):
+        """
+        Remove a value from the cache.
+
+        Args:
+            key (str): Cache key from make_key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.cache_dir:
+            self._remove_file(self._file_path(key))
+
+    def _remember(self, key, expires_at, value):
+        """Insert an entry in memory, evicting the least recently used one if full."""
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _track_disk_usage(self, file_path):
+        """Add a written entry to the disk size, evicting old entries once over the limit."""
+        try:
+            written = os.path.getsize(file_path)
+        except OSError:
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                # The first write measures everything already on disk, including this entry
+                self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+            else:
+                # Overwrites are counted twice; the next eviction pass corrects the total
+                self._disk_bytes += written
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _disk_entries(self):
+        """List the persisted entries as (modified time, path, size) tuples."""
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as scanner:
+                for entry in scanner:
+                    if entry.name.endswith(".json"):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, entry.path, stat.st_size))
+        except OSError:
+            pass
+        return entries
+
+    def _evict_disk(self):
+        """Remove the oldest persisted entries until they fit in max_disk_bytes."""
+        # Evict a little below the limit so the directory isn't rescanned on every write
+        target = self.max_disk_bytes * 0.9
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, _, size in entries)
+        for _, file_path, size in entries:
+            if total <= target:
+                break
+            self._remove_file(file_path)
+            total -= size
+        self._disk_bytes = total
+
+    def _file_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    @staticmethod
+    def _remove_file(file_path):
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+
+class SemanticCache:
+    def __init__(self, embed_fn, threshold=0.92, max_entries=256, max_scopes=64):
+        """
+        Initialize a cache that matches near-duplicate queries by embedding similarity.
+
+        Args:
+            embed_fn (callable): Function returning an embedding vector (or None) for a text
+            threshold (float): Minimum cosine similarity for a stored answer to be reused
+            max_entries (int): Maximum number of entries kept per scope
+            max_scopes (int): Maximum number of scopes (e.g. videos) kept in memory
+        """
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+
+        # scope -> {'vectors': ndarray of unit vectors, 'values': list}
+        self._scopes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed(self, text):
+        """
+        Embed a query as a unit-length vector.
+
+        Args:
+            text (str): Query text
+
+        Returns:
+            numpy.ndarray: Normalized embedding, or None if embedding failed
+        """
+        vector = self.embed_fn(text)
+        if vector is None or len(vector) == 0:
+            return None
+
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        return vector / norm
+
+    def get(self, scope, vector):
+        """
+        Find the stored value whose query is most similar to the given embedding.
+
+        Args:
+            scope (str): Namespace for the lookup (e.g. a hash of the video context)
+            vector (numpy.ndarray): Normalized query embedding from embed
+
+        Returns:
+            any: Cached value if the best match clears the threshold, otherwise None
+        """
+        if vector is None:
+            return None
+
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if entry is None or not entry['values']:
+                return None
+            self._scopes.move_to_end(scope)
+
+            # Cosine similarity reduces to a dot product on unit vectors
+            similarities = entry['vectors'] @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                return entry['values'][best]
+        return None
+
+    def set(self, scope, vector, value):
+        """
+        Store a value under the given query embedding.
+
+        Args:
+            scope (str): Namespace for the entry
+            vector (numpy.ndarray): Normalized query embedding from embed
+            value (any): Value to return for similar queries
+        """
+        if vector is None:
+            return
+
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if entry is None:
+                entry = {'vectors': np.empty((0, vector.shape[0]), dtype=np.float32), 'values': []}
+                self._scopes[scope] = entry
+            self._scopes.move_to_end(scope)
+
+            entry['vectors'] = np.vstack([entry['vectors'], vector])[-self.max_entries:]
+            entry['values'] = (entry['values'] + [value])[-self.max_entries:]
+
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
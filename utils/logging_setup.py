@@ -0,0 +1,35 @@
+"""
+Process-wide logging configuration.
+"""
+
+import os
+import queue
+import logging
+import logging.handlers
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def configure_logging():
+    """
+    Send log records through a queue to a background thread that writes them to stderr.
+
+    Agents log from many Streamlit session threads at once; with a queue in front
+    of the stream handler, logging a failure never blocks on the write itself.
+    Streamlit re-runs the app script on every interaction, so this only takes
+    effect the first time it is called.
+
+    Returns:
+        logging.handlers.QueueListener: The running listener
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(os.getenv("LOG_LEVEL", "WARNING").upper())
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
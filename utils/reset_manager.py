@@ -3,10 +3,18 @@ Utility for managing user reset operations and tracking reset events.
 """
 
 import os
-from pathlib import Path
 import time
+import threading
+from utils.user_paths import ensure_dir, sanitize_email
 
 class ResetManager:
+    # Sanitized emails that have a reset marker, shared by all instances. The directory
+    # is rescanned only when its modification time changes, so markers written or
+    # removed by another process are still seen without listing it on every check
+    _reset_names = None
+    _reset_names_mtime = None
+    _reset_names_lock = threading.Lock()
+    
     def __init__(self):
         """Initialize the Reset Manager"""
         # Get the data directory
@@ -15,7 +23,7 @@ class ResetManager:
         self.reset_users_dir = os.path.join(self.data_dir, "reset_users")
         
         # Ensure the reset users directory exists
-        Path(self.reset_users_dir).mkdir(parents=True, exist_ok=True)
+        ensure_dir(self.reset_users_dir)
     
     def record_reset(self, email):
         """
@@ -32,7 +40,7 @@ class ResetManager:
                 return False
                 
             # Generate sanitized filename
-            sanitized_email = email.replace('@', '_at_').replace('.', '_dot_')
+            sanitized_email = sanitize_email(email)
             reset_marker = os.path.join(self.reset_users_dir, f"{sanitized_email}.reset")
             
             # Create timestamp
@@ -41,6 +49,8 @@ class ResetManager:
             # Write reset marker file with timestamp
             with open(reset_marker, 'w') as f:
                 f.write(f"User {email} was reset at {timestamp}")
+            
+            self._get_reset_names().add(sanitized_email)
                 
             return True
             
@@ -60,9 +70,55 @@ class ResetManager:
         """
         if not email:
             return False
+        
+        return sanitize_email(email) in self._get_reset_names()
+    
+    def clear_reset(self, email):
+        """
+        Remove a user's reset marker
+        
+        Args:
+            email (str): User email whose reset was handled
             
-        # Generate sanitized filename
-        sanitized_email = email.replace('@', '_at_').replace('.', '_dot_')
+        Returns:
+            bool: True if a marker was removed, False if there was none
+        """
+        if not email:
+            return False
+        
+        sanitized_email = sanitize_email(email)
         reset_marker = os.path.join(self.reset_users_dir, f"{sanitized_email}.reset")
+        self._get_reset_names().discard(sanitized_email)
+        
+        try:
+            os.remove(reset_marker)
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def _get_reset_names(self):
+        """
+        Get the set of sanitized emails with a reset marker, rescanning the directory
+        only when it has changed since the last scan.
+        
+        Returns:
+            set: Sanitized emails of reset users
+        """
+        try:
+            mtime = os.stat(self.reset_users_dir).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
         
-        return os.path.exists(reset_marker)
\ No newline at end of file
+        if ResetManager._reset_names is None or mtime != ResetManager._reset_names_mtime:
+            with ResetManager._reset_names_lock:
+                if ResetManager._reset_names is None or mtime != ResetManager._reset_names_mtime:
+                    try:
+                        with os.scandir(self.reset_users_dir) as entries:
+                            ResetManager._reset_names = {
+                                entry.name[:-len(".reset")] for entry in entries
+                                if entry.name.endswith(".reset")
+                            }
+                    except FileNotFoundError:
+                        ResetManager._reset_names = set()
+                    ResetManager._reset_names_mtime = mtime
+        return ResetManager._reset_names
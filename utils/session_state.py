@@ -1,8 +1,9 @@
 import streamlit as st
 import os
-import json
 from pathlib import Path
 from glob import glob
+from utils.json_utils import read_json
+from utils.user_paths import user_settings_filename
 
 def get_iap_email():
     """
@@ -94,15 +95,13 @@ def check_and_load_user_settings(email=None):
         return False
     
     # Generate the expected filename for this email
-    sanitized_email = email.replace('@', '_at_').replace('.', '_dot_')
-    user_settings_file = f"user_settings_{sanitized_email}.json"
+    user_settings_file = user_settings_filename(email)
     
     # Check if the file exists
     if os.path.exists(user_settings_file):
         try:
             # Load the settings
-            with open(user_settings_file, 'r') as f:
-                settings = json.load(f)
+            settings = read_json(user_settings_file)
             
             # Update session state with these settings
             for key, value in settings.items():
@@ -142,11 +141,10 @@ def initialize_session_state():
         # Take the most recently modified file
         latest_file = max(user_settings_files, key=os.path.getmtime)
         try:
-            with open(latest_file, 'r') as f:
-                settings = json.load(f)
-                # Update session state with these settings
-                for key, value in settings.items():
-                    st.session_state[key] = value
+            settings = read_json(latest_file)
+            # Update session state with these settings
+            for key, value in settings.items():
+                st.session_state[key] = value
             print(f"Loaded settings from: {latest_file}")
         except Exception as e:
             print(f"Error loading settings: {str(e)}")
@@ -0,0 +1,251 @@
+"""
+Token-aware passage splitting and BM25 retrieval over video transcripts.
+"""
+
+import re
+import math
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+
+# Approximate tokenizer: words and individual punctuation marks
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_TERM_RE = re.compile(r"\w+")
+
+# Default passage size in (approximate) tokens
+PASSAGE_TOKENS = 150
+
+# Common words that carry no retrieval signal
+_STOPWORDS = frozenset("""
+a an and are as at be but by do does for from has have how i in is it its me my of on or
+so that the their them they this to was we were what when where which who why will with
+you your about can could did should would video
+""".split())
+
+
+def count_tokens(text):
+    """
+    Approximate the number of tokens in a piece of text.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Approximate token count
+    """
+    return len(_TOKEN_RE.findall(text))
+
+
+def split_passages(text, passage_tokens=PASSAGE_TOKENS):
+    """
+    Split text into passages of roughly passage_tokens tokens.
+
+    Passages end on a sentence boundary when one falls in the last third of the
+    window, so they rarely cut a sentence in half. Transcripts without
+    punctuation are split at the token limit.
+
+    Args:
+        text (str): Text to split
+        passage_tokens (int): Target passage size in tokens
+
+    Returns:
+        list: Passages in transcript order
+    """
+    matches = list(_TOKEN_RE.finditer(text))
+    passages = []
+    start = 0
+    while start < len(matches):
+        end = min(start + passage_tokens, len(matches))
+        if end < len(matches):
+            for i in range(end - 1, start + (2 * passage_tokens) // 3, -1):
+                if matches[i].group() in ('.', '!', '?'):
+                    end = i + 1
+                    break
+        passages.append(text[matches[start].start():matches[end - 1].end()])
+        start = end
+    return passages
+
+
+def excerpt_by_tokens(text, max_tokens, separator="\n...\n"):
+    """
+    Fit text into a token budget, keeping its beginning and end.
+
+    Text within the budget is returned unchanged; otherwise the first and last
+    max_tokens // 2 tokens are kept and joined with the separator. Cuts always
+    fall on token boundaries.
+
+    Args:
+        text (str): Text to shorten
+        max_tokens (int): Approximate token budget
+        separator (str): Marker placed where the middle was removed
+
+    Returns:
+        str: Text within the token budget
+    """
+    matches = list(_TOKEN_RE.finditer(text))
+    if len(matches) <= max_tokens:
+        return text
+
+    half = max_tokens // 2
+    head = text[:matches[half - 1].end()]
+    tail = text[matches[len(matches) - half].start():]
+    return f"{head}{separator}{tail}"
+
+
+def head_by_tokens(text, max_tokens):
+    """
+    Keep the first max_tokens tokens of a text.
+
+    Only the kept part of the text is tokenized, so cutting the start off a
+    long transcript is cheap.
+
+    Args:
+        text (str): Text to shorten
+        max_tokens (int): Approximate token budget
+
+    Returns:
+        tuple: (text within the budget, whether anything was cut off)
+    """
+    matches = list(islice(_TOKEN_RE.finditer(text), max_tokens + 1))
+    if len(matches) <= max_tokens:
+        return text, False
+    return text[:matches[max_tokens - 1].end()], True
+
+
+def sample_by_tokens(text, max_tokens, head_fraction=0.7, separator="..."):
+    """
+    Fit text into a token budget by keeping its beginning and a window around its middle.
+
+    Args:
+        text (str): Text to sample
+        max_tokens (int): Approximate token budget
+        head_fraction (float): Share of the budget spent on the beginning
+        separator (str): Marker placed between the two parts
+
+    Returns:
+        str: Text within the token budget
+    """
+    matches = list(_TOKEN_RE.finditer(text))
+    if len(matches) <= max_tokens:
+        return text
+
+    head_tokens, middle_start, middle_end = _sample_bounds(len(matches), max_tokens, head_fraction)
+    head = text[:matches[head_tokens - 1].end()]
+    middle = text[matches[middle_start].start():matches[middle_end - 1].end()]
+    return f"{head}{separator}{middle}"
+
+
+@lru_cache(maxsize=256)
+def _sample_bounds(num_tokens, max_tokens, head_fraction):
+    """
+    Token indices for sample_by_tokens; re-running on the same transcript reuses them.
+
+    Returns:
+        tuple: (head length, middle start, middle end)
+    """
+    head_tokens = int(max_tokens * head_fraction)
+    middle_tokens = max_tokens - head_tokens
+    middle_start = max(head_tokens, num_tokens // 2 - middle_tokens // 2)
+    middle_end = min(num_tokens, middle_start + middle_tokens)
+    return head_tokens, middle_start, middle_end
+
+
+def _terms(text):
+    return [term for term in _TERM_RE.findall(text.lower()) if term not in _STOPWORDS]
+
+
+class TranscriptIndex:
+    def __init__(self, transcript, passage_tokens=PASSAGE_TOKENS, k1=1.5, b=0.75):
+        """
+        Split a transcript into passages and build a BM25 index over them.
+
+        Args:
+            transcript (str): Video transcript
+            passage_tokens (int): Target passage size in tokens
+            k1 (float): BM25 term-frequency saturation
+            b (float): BM25 length normalization
+        """
+        self.passages = split_passages(transcript, passage_tokens)
+        self.k1 = k1
+        self.b = b
+
+        self._token_counts = [count_tokens(passage) for passage in self.passages]
+        self._term_freqs = [Counter(_terms(passage)) for passage in self.passages]
+        self._lengths = [sum(freqs.values()) for freqs in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0
+
+        document_freqs = Counter()
+        for freqs in self._term_freqs:
+            document_freqs.update(freqs.keys())
+        num_passages = len(self.passages)
+        self._idf = {
+            term: math.log(1 + (num_passages - freq + 0.5) / (freq + 0.5))
+            for term, freq in document_freqs.items()
+        }
+
+    def top_passages(self, query, n=3):
+        """
+        Find the passages most relevant to a query.
+
+        Args:
+            query (str): Search query (e.g. the user's question)
+            n (int): Maximum number of passages to return
+
+        Returns:
+            list: Up to n passages, in transcript order
+        """
+        query_terms = set(_terms(query))
+        if not self.passages:
+            return []
+        if not query_terms:
+            return self.passages[:n]
+
+        scores = []
+        for index, freqs in enumerate(self._term_freqs):
+            length_norm = self.k1 * (1 - self.b + self.b * self._lengths[index] / (self._avg_length or 1))
+            score = 0.0
+            for term in query_terms:
+                freq = freqs.get(term)
+                if freq:
+                    score += self._idf[term] * freq * (self.k1 + 1) / (freq + length_norm)
+            scores.append(score)
+
+        if not any(scores):
+            # Nothing matched - fall back to the opening of the video
+            return self.passages[:n]
+
+        best = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:n]
+        return [self.passages[index] for index in sorted(best) if scores[index] > 0]
+
+    def sample_passages(self, max_tokens):
+        """
+        Pick passages spread evenly over the whole transcript.
+
+        Args:
+            max_tokens (int): Approximate token budget for the selected passages
+
+        Returns:
+            list: Selected passages, in transcript order
+        """
+        total_tokens = sum(self._token_counts)
+        if total_tokens <= max_tokens:
+            return list(self.passages)
+
+        count = max(1, len(self.passages) * max_tokens // total_tokens)
+        step = len(self.passages) / count
+        return [self.passages[int(i * step)] for i in range(count)]
+
+
+@lru_cache(maxsize=8)
+def get_transcript_index(transcript, passage_tokens=PASSAGE_TOKENS):
+    """
+    Get the index for a transcript, building it only the first time it is seen.
+
+    Args:
+        transcript (str): Video transcript
+        passage_tokens (int): Target passage size in tokens
+
+    Returns:
+        TranscriptIndex: Index over the transcript's passages
+    """
+    return TranscriptIndex(transcript, passage_tokens)
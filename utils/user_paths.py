@@ -0,0 +1,66 @@
+"""
+File naming and directory helpers for per-user data.
+"""
+
+import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def sanitize_email(email):
+    """
+    Turn an email address into a file-system friendly name.
+
+    Args:
+        email (str): User email address
+
+    Returns:
+        str: Sanitized name, e.g. "jane_at_example_dot_com"
+    """
+    return email.replace('@', '_at_').replace('.', '_dot_')
+
+
+def user_settings_filename(email):
+    """
+    Get the settings file name for a user.
+
+    Args:
+        email (str): User email address
+
+    Returns:
+        str: File name (without directory), e.g. "user_settings_jane_at_example_dot_com.json"
+    """
+    return f"user_settings_{sanitize_email(email)}.json"
+
+
+@lru_cache(maxsize=256)
+def user_settings_path(data_dir, email):
+    """
+    Get the full path of a user's settings file.
+
+    Args:
+        data_dir (str): Directory holding the settings files
+        email (str): User email address
+
+    Returns:
+        str: Path of the user's settings file
+    """
+    return os.path.join(data_dir, user_settings_filename(email))
+
+
+@lru_cache(maxsize=None)
+def ensure_dir(path):
+    """
+    Create a directory if needed, checking each path only once per process.
+
+    Agents and settings objects are constructed on every Streamlit rerun, so the
+    directory check would otherwise be repeated on each one.
+
+    Args:
+        path (str): Directory path
+
+    Returns:
+        str: The same path
+    """
+    os.makedirs(path, exist_ok=True)
+    return path
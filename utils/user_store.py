@@ -0,0 +1,276 @@
+"""
+SQLite-backed storage for user settings and personalized learning paths.
+
+Learning paths are stored as a base snapshot plus small JSON patches for later
+revisions, since most updates only move one milestone forward.
+"""
+
+import logging
+import os
+import copy
+import glob
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from utils.json_utils import dumps, loads
+from utils.json_patch import apply_patch, make_patch
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+
+# Database holding one row per user
+DB_PATH = os.path.join(DATA_DIR, "users.db")
+
+# Directory of the per-user JSON files used before the database existed
+LEGACY_USERS_DIR = os.path.join(DATA_DIR, "users")
+
+# Learning path revisions stored as patches before they are folded into a new base snapshot
+MAX_LEARNING_PATH_DELTAS = 16
+
+
+class UserStore:
+    def __init__(self, db_path=DB_PATH, cache_size=1024):
+        """
+        Open (and if needed create) the user database.
+
+        Args:
+            db_path (str): Path of the SQLite database file
+            cache_size (int): Maximum number of users whose parsed data is kept in memory
+        """
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        # email -> parsed user data, least recently used first
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._data_version = None
+
+        # One connection shared by all Streamlit sessions; writes are serialized by the lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            # WAL lets readers proceed during a write; NORMAL sync is safe with WAL
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS users("
+                "email TEXT PRIMARY KEY, settings TEXT, learning_path TEXT, auth_source TEXT)"
+            )
+            # users.learning_path is a base snapshot; later revisions are JSON patches on top of it
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS learning_path_deltas("
+                "email TEXT NOT NULL, seq INTEGER NOT NULL, patch TEXT NOT NULL, PRIMARY KEY(email, seq))"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT)")
+
+    def get(self, email):
+        """
+        Load a user's data.
+
+        Args:
+            email (str): User's email address
+
+        Returns:
+            dict: User data (email, settings, learning_path, auth_source), or None if not found
+        """
+        with self._lock:
+            entry = self._load(email)
+        return copy.deepcopy(entry[0]) if entry is not None else None
+
+    def _load(self, email):
+        """
+        Load a user's data through the cache; the caller must hold the lock.
+
+        Args:
+            email (str): User's email address
+
+        Returns:
+            tuple: (cached user data, not a copy; number of stored learning path revisions),
+                or None if not found
+        """
+        # data_version changes when another connection (e.g. another process) writes,
+        # so the cache only has to be dropped when the database changed underneath it
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._cache.clear()
+            self._data_version = data_version
+
+        entry = self._cache.get(email)
+        if entry is not None:
+            self._cache.move_to_end(email)
+            return entry
+
+        row = self._conn.execute(
+            "SELECT email, settings, learning_path, auth_source FROM users WHERE email = ?",
+            (email,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        # Rebuild the current learning path from the base snapshot and its revisions
+        learning_path = loads(row[2]) if row[2] else {}
+        deltas = self._conn.execute(
+            "SELECT patch FROM learning_path_deltas WHERE email = ? ORDER BY seq", (email,)
+        ).fetchall()
+        for (patch,) in deltas:
+            learning_path = apply_patch(learning_path, loads(patch))
+
+        user_data = {
+            'email': row[0],
+            'settings': loads(row[1]) if row[1] else {},
+            'learning_path': learning_path,
+            'auth_source': row[3]
+        }
+        entry = (user_data, len(deltas))
+        self._cache[email] = entry
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return entry
+
+    def upsert(self, email, settings, learning_path, auth_source):
+        """
+        Insert or replace a user's data.
+
+        Args:
+            email (str): User's email address
+            settings (dict): User's settings
+            learning_path (dict): User's personalized learning path
+            auth_source (str): How the user's email was obtained (direct, google, iap, ...)
+        """
+        with self._lock, self._conn:
+            entry = self._load(email)
+            if entry is None:
+                self._conn.execute(
+                    "INSERT INTO users(email, settings, learning_path, auth_source) VALUES (?, ?, ?, ?)",
+                    (email, dumps(settings), dumps(learning_path), auth_source)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE users SET settings = ?, auth_source = ? WHERE email = ?",
+                    (dumps(settings), auth_source, email)
+                )
+
+                # Most updates touch a single milestone, so store only what changed,
+                # folding the revisions into a new snapshot once there are enough of them
+                current, num_deltas = entry
+                patch = make_patch(current['learning_path'], learning_path)
+                if patch and num_deltas >= MAX_LEARNING_PATH_DELTAS:
+                    self._conn.execute(
+                        "UPDATE users SET learning_path = ? WHERE email = ?", (dumps(learning_path), email)
+                    )
+                    self._conn.execute("DELETE FROM learning_path_deltas WHERE email = ?", (email,))
+                elif patch:
+                    self._conn.execute(
+                        "INSERT INTO learning_path_deltas(email, seq, patch) VALUES (?, ?, ?)",
+                        (email, num_deltas, dumps(patch))
+                    )
+            self._cache.pop(email, None)
+
+    def rename(self, old_email, new_email, settings=None):
+        """
+        Move a user's data to a new email address.
+
+        Args:
+            old_email (str): Current email address
+            new_email (str): New email address
+            settings (dict, optional): Updated settings to store along with the new email
+
+        Returns:
+            bool: True if the user was renamed, False if not found or new_email is taken
+        """
+        try:
+            with self._lock, self._conn:
+                if settings is None:
+                    cursor = self._conn.execute(
+                        "UPDATE users SET email = ? WHERE email = ?", (new_email, old_email)
+                    )
+                else:
+                    cursor = self._conn.execute(
+                        "UPDATE users SET email = ?, settings = ? WHERE email = ?",
+                        (new_email, dumps(settings), old_email)
+                    )
+                if cursor.rowcount == 1:
+                    self._conn.execute(
+                        "UPDATE learning_path_deltas SET email = ? WHERE email = ?", (new_email, old_email)
+                    )
+                self._cache.pop(old_email, None)
+                self._cache.pop(new_email, None)
+                return cursor.rowcount == 1
+        except sqlite3.IntegrityError:
+            return False
+
+    def delete(self, email):
+        """
+        Delete a user's data.
+
+        Args:
+            email (str): User's email address
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM users WHERE email = ?", (email,))
+            self._conn.execute("DELETE FROM learning_path_deltas WHERE email = ?", (email,))
+            self._cache.pop(email, None)
+
+    def migrate_from_json_dir(self, users_dir=LEGACY_USERS_DIR):
+        """
+        Import the legacy per-user JSON files, once.
+
+        Users already in the database are kept as they are, and the import is
+        recorded so files left behind never overwrite later changes or bring
+        back deleted users.
+
+        Args:
+            users_dir (str): Directory containing the per-user JSON files
+
+        Returns:
+            int: Number of users imported
+        """
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'json_migrated'"
+            ).fetchone()
+        if done:
+            return 0
+
+        rows = []
+        for file_path in glob.glob(os.path.join(users_dir, "*.json")):
+            try:
+                with open(file_path, 'r') as f:
+                    user_data = loads(f.read())
+                if not user_data.get('email'):
+                    continue
+                rows.append((
+                    user_data['email'],
+                    dumps(user_data.get('settings') or {}),
+                    dumps(user_data.get('learning_path') or {}),
+                    user_data.get('auth_source', 'direct')
+                ))
+            except Exception as e:
+                logger.warning("Skipping user file %s: %s", file_path, e)
+
+        with self._lock, self._conn:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO users(email, settings, learning_path, auth_source) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('json_migrated', '1')")
+            self._cache.clear()
+
+        return cursor.rowcount if cursor.rowcount > 0 else 0
+
+
+@lru_cache(maxsize=1)
+def get_user_store():
+    """
+    Get the process-wide user store, importing legacy JSON user files on first use.
+
+    Returns:
+        UserStore: Shared user store
+    """
+    store = UserStore()
+    migrated = store.migrate_from_json_dir()
+    if migrated:
+        logger.info("Imported %d users from %s", migrated, LEGACY_USERS_DIR)
+    return store